@@ -0,0 +1,138 @@
+import pandas as pd
+from FP_analysis_options import ALIGNMENTS
+
+"""
+Time-series alignment of hotel prices with hourly weather.
+
+The plain date join pairs every hotel row with every cached hour of its city
+and day, so a day with 24 cached hours counts each price 24 times. These
+helpers align each hotel row with exactly one weather record instead:
+
+- summarize_weather folds hourly rows into per-(city, window) summaries
+  (mean/min/max temp, dominant weather type, any extreme hour);
+- align_daily joins hotels to the summary of their check-in day;
+- align_nearest_hour matches each hotel to the closest cached hour around
+  check-in time with pandas.merge_asof.
+
+Weather_Data datetimes are UTC (FP_weather_request formats the API's unix
+timestamps with utcfromtimestamp), while check-in time is local to the hotel,
+so nearest-hour matching converts it with each city's IANA time zone, and
+daily summaries convert the weather hours to local time before cutting days.
+"""
+
+# Local check-in time used as the hotel's timestamp for nearest-hour matching
+CHECK_IN_HOUR = 15
+NEAREST_TOLERANCE_HOURS = 3
+
+
+def summarize_weather(weather_df, freq='D', timezones=None):
+    """
+    Aggregates hourly weather (location, datetime, temp, humidity, wind_speed,
+    weather_type, is_extreme) into one row per location and `freq` window.
+    `temp` holds the window mean, next to temp_min and temp_max; weather_type
+    is the most frequent type in the window (ties go to the first by name).
+    timezones maps locations to IANA zones; windows are cut on the local clock.
+    """
+    df = weather_df.copy()
+    local_time = utc_to_local(pd.to_datetime(df['datetime']), df['location'], timezones)
+    df['window_start'] = local_time.dt.floor(freq)
+    keys = ['location', 'window_start']
+
+    summary = df.groupby(keys).agg(
+        temp=pd.NamedAgg(column='temp', aggfunc='mean'),
+        temp_min=pd.NamedAgg(column='temp', aggfunc='min'),
+        temp_max=pd.NamedAgg(column='temp', aggfunc='max'),
+        humidity=pd.NamedAgg(column='humidity', aggfunc='mean'),
+        wind_speed=pd.NamedAgg(column='wind_speed', aggfunc='mean'),
+        is_extreme=pd.NamedAgg(column='is_extreme', aggfunc='max'),
+        hours=pd.NamedAgg(column='temp', aggfunc='size')
+    ).reset_index()
+    summary['is_extreme'] = summary['is_extreme'].fillna(0).astype(int)
+
+    dominant = (
+        df.groupby(keys + ['weather_type']).size().reset_index(name='type_hours')
+        .sort_values(keys + ['type_hours', 'weather_type'], ascending=[True, True, False, True])
+        .drop_duplicates(keys)
+        [keys + ['weather_type']]
+    )
+    summary = summary.merge(dominant, on=keys, how='left')
+    summary['date'] = summary['window_start'].dt.date
+    return summary
+
+
+def align_daily(hotel_df, weather_df, timezones=None):
+    """
+    One row per hotel, joined to its city's weather summary for the local
+    check-in day (see summarize_weather for timezones)
+    """
+    daily = summarize_weather(weather_df, freq='D', timezones=timezones)
+    hotels = hotel_df.copy()
+    hotels['check_in_date'] = pd.to_datetime(hotels['check_in_date']).dt.date
+    return pd.merge(
+        hotels,
+        daily,
+        left_on=['location', 'check_in_date'],
+        right_on=['location', 'date'],
+        how='inner'
+    )
+
+
+def local_to_utc(times, locations, timezones):
+    """
+    Converts naive local datetimes to naive UTC using {location: IANA zone}.
+    Locations without a zone are assumed to be in UTC already.
+    """
+    utc = times.copy()
+    for location, zone in (timezones or {}).items():
+        mask = locations == location
+        if mask.any():
+            utc[mask] = (times[mask].dt.tz_localize(zone, ambiguous='NaT', nonexistent='shift_forward')
+                         .dt.tz_convert('UTC').dt.tz_localize(None))
+    return utc
+
+
+def utc_to_local(times, locations, timezones):
+    """
+    Converts naive UTC datetimes to naive local time using {location: IANA zone}.
+    Locations without a zone stay in UTC.
+    """
+    local = times.copy()
+    for location, zone in (timezones or {}).items():
+        mask = locations == location
+        if mask.any():
+            local[mask] = times[mask].dt.tz_localize('UTC').dt.tz_convert(zone).dt.tz_localize(None)
+    return local
+
+
+def align_nearest_hour(hotel_df, weather_df, timezones=None, check_in_hour=CHECK_IN_HOUR,
+                       tolerance_hours=NEAREST_TOLERANCE_HOURS):
+    """
+    One row per hotel, matched to the cached hour of its city nearest to
+    check-in time (check_in_date + check_in_hour, local time) within
+    tolerance_hours. timezones maps locations to IANA zones and turns the
+    local check-in time into UTC, the clock of the weather datetimes.
+    Hotels without a cached hour in range are dropped.
+    """
+    hotels = hotel_df.copy()
+    check_in = pd.to_datetime(hotels['check_in_date'])
+    hotels['check_in_time'] = local_to_utc(check_in + pd.Timedelta(hours=check_in_hour),
+                                           hotels['location'], timezones)
+    hotels['check_in_date'] = check_in.dt.date
+    hotels = hotels.dropna(subset=['check_in_time']).sort_values('check_in_time')
+
+    weather = weather_df.copy()
+    weather['weather_time'] = pd.to_datetime(weather['datetime'])
+    weather = weather.dropna(subset=['weather_time']).sort_values('weather_time')
+
+    merged = pd.merge_asof(
+        hotels,
+        weather,
+        left_on='check_in_time',
+        right_on='weather_time',
+        by='location',
+        direction='nearest',
+        tolerance=pd.Timedelta(hours=tolerance_hours)
+    )
+    merged = merged.dropna(subset=['weather_time']).reset_index(drop=True)
+    merged['date'] = merged['weather_time'].dt.date
+    return merged
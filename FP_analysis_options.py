@@ -0,0 +1,10 @@
+"""
+Names of the analysis engines and weather alignments.
+
+Kept free of pandas so main.py can validate --engine and --alignment while
+parsing arguments without loading the analysis stack.
+"""
+
+ENGINES = ('pandas', 'sql', 'streaming', 'rollup')
+
+ALIGNMENTS = ('hourly', 'daily', 'nearest')
@@ -1,14 +1,98 @@
 import sqlite3
-import matplotlib.pyplot as plt
 import pandas as pd
 import numpy as np
+import json
 import os
+from FP_schema import apply_pragmas, ensure_hotel_schema, ensure_weather_schema
+from FP_streaming import stream_hotel_weather_stats, RunningMoments
+from FP_metrics import METRICS
+from FP_analysis_options import ENGINES, ALIGNMENTS
+from FP_alignment import align_daily, align_nearest_hour
+from FP_charts import ChartJob, MANIFEST_FILE, render_charts, render_city_bars, render_scatter, render_line
+
+# Hotel rows joined to every hourly weather row of the same city and day
+SQL_JOIN = '''
+    FROM hotels h
+    JOIN weather.Weather_Data wd ON wd.city = h.location AND wd.date = h.check_in_date
+    JOIN weather.Weather_Type wt ON wd.weather_type_id = wt.id
+'''
+
+# hotels rows are price runs (FP_price_history); weighting each by its number
+# of scrapes averages over scrapes, as the per-scrape table did
+AVG_PRICE = "SUM(h.price * h.scrapes) / SUM(CASE WHEN h.price IS NOT NULL THEN h.scrapes END)"
+AVG_TEMP = "SUM(wd.temp * h.scrapes) / SUM(CASE WHEN wd.temp IS NOT NULL THEN h.scrapes END)"
+
+# Per-day rollups (FP_rollup) joined the same way; every hotel row of a day
+# pairs with every weather row of that day, so sums are cross-weighted by
+# the other side's row count
+ROLLUP_JOIN = '''
+    FROM Hotel_Daily_Rollup h
+    JOIN weather.Weather_Daily_Rollup w ON w.city = h.location AND w.date = h.check_in_date
+'''
+
+ROLLUP_DAY_JOIN = '''
+    FROM Hotel_Daily_Rollup h
+    JOIN (
+        SELECT city, date, SUM(n) AS n, SUM(n_temp) AS n_temp,
+               SUM(sum_temp) AS sum_temp, SUM(sum_temp_sq) AS sum_temp_sq
+        FROM weather.Weather_Daily_Rollup
+        GROUP BY city, date
+    ) w ON w.city = h.location AND w.date = h.check_in_date
+'''
+
+def frame_columns(df):
+    """DataFrame as {column: list of values}, cheap to pickle and hash"""
+    return {column: df[column].tolist() for column in df.columns}
+
+def default_chart_jobs(charts_dir='charts'):
+    return [
+        ChartJob('city_bars', 'city_stats', os.path.join(charts_dir, 'price_by_weather.png')),
+        ChartJob('scatter', 'price_temp_points', os.path.join(charts_dir, 'price_temp_scatter.png')),
+        ChartJob('line', 'price_by_temp', os.path.join(charts_dir, 'price_temp_line.png')),
+    ]
 
 class WeatherHotelAnalyzer:
-    def __init__(self, hotel_db_path='weather_hotel_data.db', weather_db_path='weather.db'):
-        """Initialize analyzer with paths to both databases"""
+    def __init__(self, hotel_db_path='weather_hotel_data.db', weather_db_path='weather.db', cache_path=None,
+                 engine='pandas', chunksize=10000, alignment='hourly', timezones=None):
+        """Initialize analyzer with paths to both databases
+
+        cache_path optionally names a Parquet file where the merged frame is
+        persisted between runs, next to a JSON sidecar with its DB fingerprint.
+
+        engine='pandas' merges the raw tables in memory; engine='sql' attaches
+        the weather database to the hotel connection and lets SQLite compute
+        each aggregate over the indexed (location, date) join; engine='streaming'
+        reads both tables in chunks of `chunksize` rows and folds them into
+        running accumulators, so memory stays flat as history grows;
+        engine='rollup' reads the per-day rollup tables kept up to date on
+        ingest (FP_rollup) and falls back to the sql engine for per-temperature
+        views the rollups do not cover.
+
+        alignment (pandas engine only) picks how hotels meet weather: 'hourly'
+        pairs each hotel with every cached hour of its check-in day, 'daily'
+        with one per-(city, day) summary and 'nearest' with the cached hour
+        closest to check-in time (see FP_alignment). timezones maps each
+        city to its IANA time zone so 'nearest' can compare local check-in
+        time with the UTC weather hours and 'daily' can cut local days.
+        """
+        if engine not in ENGINES:
+            raise ValueError(f"Unknown engine '{engine}', expected one of {ENGINES}")
+        if alignment not in ALIGNMENTS:
+            raise ValueError(f"Unknown alignment '{alignment}', expected one of {ALIGNMENTS}")
+        if alignment != 'hourly' and engine != 'pandas':
+            raise ValueError(f"alignment '{alignment}' requires the pandas engine")
         self.hotel_db_path = hotel_db_path
         self.weather_db_path = weather_db_path
+        self.cache_path = cache_path
+        self.engine = engine
+        self.chunksize = chunksize
+        self.alignment = alignment
+        self.timezones = dict(timezones or {})
+        self._weather_attached = False
+        self._stream_cache = None
+        self._stream_fingerprint = None
+        self._merged_cache = None
+        self._merged_fingerprint = None
         
         if not os.path.exists(hotel_db_path):
             raise FileNotFoundError(f"Hotel database not found: {hotel_db_path}")
@@ -17,6 +101,11 @@ class WeatherHotelAnalyzer:
         
         self.hotel_conn = sqlite3.connect(hotel_db_path)
         self.weather_conn = sqlite3.connect(weather_db_path)
+        for conn in (self.hotel_conn, self.weather_conn):
+            apply_pragmas(conn)
+        if engine in ('sql', 'streaming', 'rollup'):
+            ensure_hotel_schema(self.hotel_conn)
+            ensure_weather_schema(self.weather_conn)
         
         os.makedirs('charts', exist_ok=True)
         
@@ -27,13 +116,88 @@ class WeatherHotelAnalyzer:
         if hasattr(self, 'weather_conn'):
             self.weather_conn.close()
             
+    def _table_fingerprint(self, db_path, conn, table):
+        """File mtimes, data_version and row stats identifying one table's contents"""
+        mtimes = [os.path.getmtime(path) for path in (db_path, db_path + '-wal') if os.path.exists(path)]
+        data_version = conn.execute("PRAGMA data_version").fetchone()[0]
+        count, max_id = conn.execute(f"SELECT COUNT(*), MAX(id) FROM {table}").fetchone()
+        return [mtimes, data_version, count, max_id]
+
+    def get_data_fingerprint(self):
+        """Fingerprint of both databases; changes whenever either is written"""
+        return {
+            'hotels': self._table_fingerprint(self.hotel_db_path, self.hotel_conn, 'hotels'),
+            'weather': self._table_fingerprint(self.weather_db_path, self.weather_conn, 'Weather_Data'),
+            'alignment': self.alignment,
+            'timezones': self.timezones,
+        }
+
     def get_merged_data(self):
-        """Join hotel and weather data based on location and date"""
+        """Join hotel and weather data based on location and date
+
+        The merged frame is memoized and reused until the DB fingerprint
+        changes. Callers share the cached frame and must not modify it.
+        """
+        fingerprint = self.get_data_fingerprint()
+        if self._merged_cache is not None and self._merged_fingerprint == fingerprint:
+            METRICS.incr('cache_hits', cache='merged_memory')
+            return self._merged_cache
+
+        merged_df = self._load_persisted_merge(fingerprint)
+        if merged_df is None:
+            with METRICS.span('merge', engine='pandas', alignment=self.alignment):
+                merged_df = self._build_merged_data()
+            self._persist_merge(merged_df, fingerprint)
+        else:
+            METRICS.incr('cache_hits', cache='merged_parquet')
+
+        self._merged_cache = merged_df
+        self._merged_fingerprint = fingerprint
+        return merged_df
+
+    def invalidate_cache(self):
+        """Drop the in-memory merged frame"""
+        self._merged_cache = None
+        self._merged_fingerprint = None
+
+    def _load_persisted_merge(self, fingerprint):
+        """Read the merged frame from cache_path if its fingerprint still matches"""
+        if not self.cache_path or not os.path.exists(self.cache_path):
+            return None
+        try:
+            with open(self.cache_path + '.json', 'r', encoding='utf-8') as f:
+                stored = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if stored != fingerprint:
+            return None
+        try:
+            return pd.read_parquet(self.cache_path)
+        except (ImportError, OSError, ValueError) as e:
+            print(f"Could not read merged cache {self.cache_path}: {e}")
+            return None
+
+    def _persist_merge(self, merged_df, fingerprint):
+        """Write the merged frame to cache_path (requires pyarrow)"""
+        if not self.cache_path:
+            return
+        try:
+            merged_df.to_parquet(self.cache_path, index=False)
+        except (ImportError, OSError, ValueError) as e:
+            print(f"Could not write merged cache {self.cache_path}: {e}")
+            return
+        with open(self.cache_path + '.json', 'w', encoding='utf-8') as f:
+            json.dump(fingerprint, f)
+
+    def _build_merged_data(self):
+        """Read both databases and merge them in pandas"""
         hotel_df = pd.read_sql_query('''
             SELECT hotel_name, location, price, rating, 
-                   review_count, scrape_date, check_in_date
+                   review_count, scrape_date, check_in_date, scrapes
             FROM hotels
         ''', self.hotel_conn)
+        # One row per scrape again, so every alignment weighs runs by their length
+        hotel_df = hotel_df.loc[hotel_df.index.repeat(hotel_df.pop('scrapes'))].reset_index(drop=True)
         
         weather_df = pd.read_sql_query('''
             SELECT wd.city as location, wd.datetime, wd.temp, 
@@ -42,6 +206,11 @@ class WeatherHotelAnalyzer:
             FROM Weather_Data wd
             JOIN Weather_Type wt ON wd.weather_type_id = wt.id
         ''', self.weather_conn)
+
+        if self.alignment == 'daily':
+            return align_daily(hotel_df, weather_df, self.timezones)
+        if self.alignment == 'nearest':
+            return align_nearest_hour(hotel_df, weather_df, self.timezones)
         
         hotel_df['check_in_date'] = pd.to_datetime(hotel_df['check_in_date']).dt.date
         weather_df['date'] = pd.to_datetime(weather_df['datetime']).dt.date
@@ -56,142 +225,311 @@ class WeatherHotelAnalyzer:
         
         return merged_df
     
-    def plot_price_by_weather(self, save_path='charts/price_by_weather.png'):
-        """Bar chart of average hotel price and temperature for each city"""
-        df = self.get_merged_data()
-        if df.empty:
-            print("No data available for price-by-weather plot.")
-            return
+    def _attach_weather(self):
+        """ATTACH the weather database to the hotel connection once"""
+        if not self._weather_attached:
+            self.hotel_conn.execute("ATTACH DATABASE ? AS weather", (self.weather_db_path,))
+            self._weather_attached = True
+
+    def _sql_query(self, query, params=None):
+        """Run an aggregate query over the attached hotel/weather join"""
+        self._attach_weather()
+        with METRICS.span('merge', engine='sql'):
+            return pd.read_sql_query(query, self.hotel_conn, params=params)
+
+    def get_streaming_stats(self):
+        """Single chunked pass over both databases, memoized like the merged frame"""
+        fingerprint = self.get_data_fingerprint()
+        if self._stream_cache is None or self._stream_fingerprint != fingerprint:
+            with METRICS.span('merge', engine='streaming'):
+                self._stream_cache = stream_hotel_weather_stats(
+                    self.hotel_conn, self.weather_conn, chunksize=self.chunksize
+                )
+            self._stream_fingerprint = fingerprint
+        else:
+            METRICS.incr('cache_hits', cache='streaming_stats')
+        return self._stream_cache
+
+    def has_data(self):
+        """Whether the hotel/weather join has any rows"""
+        if self.engine == 'sql':
+            return not self._sql_query(f"SELECT 1 {SQL_JOIN} LIMIT 1").empty
+        if self.engine == 'rollup':
+            return not self._sql_query(f"SELECT 1 {ROLLUP_JOIN} LIMIT 1").empty
+        if self.engine == 'streaming':
+            return self.get_streaming_stats().rows > 0
+        return not self.get_merged_data().empty
+
+    def _rollup_moments(self):
+        """Merge the per-day price/temp moments of the rollups (every price pairs with every temp)"""
+        days = self._sql_query(f'''
+            SELECT h.n_price, h.sum_price, h.sum_price_sq, w.n_temp, w.sum_temp, w.sum_temp_sq
+            {ROLLUP_DAY_JOIN}
+            WHERE h.n_price > 0 AND w.n_temp > 0
+        ''')
+        moments = RunningMoments()
+        for n_price, sum_price, sum_price_sq, n_temp, sum_temp, sum_temp_sq in days.itertuples(index=False):
+            moments.merge(
+                int(n_price) * int(n_temp),
+                sum_price / n_price,
+                sum_temp / n_temp,
+                n_temp * max(0.0, sum_price_sq - sum_price * sum_price / n_price),
+                n_price * max(0.0, sum_temp_sq - sum_temp * sum_temp / n_temp)
+            )
+        return moments
+
+    def get_city_stats(self):
+        """Average price and temperature per city"""
+        if self.engine == 'streaming':
+            stats = self.get_streaming_stats()
+            prices = stats.city_price.means()
+            temps = stats.city_temp.means()
+            return pd.DataFrame({
+                'location': list(prices),
+                'avg_price': list(prices.values()),
+                'avg_temp': [temps[city] for city in prices],
+            })
+        if self.engine == 'sql':
+            return self._sql_query(f'''
+                SELECT h.location AS location, {AVG_PRICE} AS avg_price, {AVG_TEMP} AS avg_temp
+                {SQL_JOIN}
+                GROUP BY h.location
+                ORDER BY h.location
+            ''')
+        if self.engine == 'rollup':
+            return self._sql_query(f'''
+                SELECT h.location AS location,
+                       SUM(h.sum_price * w.n) / SUM(h.n_price * w.n) AS avg_price,
+                       SUM(w.sum_temp * h.n) / SUM(w.n_temp * h.n) AS avg_temp
+                {ROLLUP_DAY_JOIN}
+                GROUP BY h.location
+                ORDER BY h.location
+            ''')
+        return self.get_merged_data().groupby('location').agg(
+            avg_price=pd.NamedAgg(column='price', aggfunc='mean'),
+            avg_temp=pd.NamedAgg(column='temp', aggfunc='mean')
+        ).reset_index()
 
-        stats = df.groupby('location').agg({'price': 'mean', 'temp': 'mean'}).reset_index()
+    def get_price_by_location_weather(self):
+        """Average price per city and weather type"""
+        if self.engine == 'streaming':
+            means = self.get_streaming_stats().location_weather_price.means()
+            return pd.DataFrame(
+                [(location, weather_type, avg) for (location, weather_type), avg in means.items()],
+                columns=['location', 'weather_type', 'avg_price']
+            )
+        if self.engine == 'sql':
+            return self._sql_query(f'''
+                SELECT h.location AS location, wt.title AS weather_type, {AVG_PRICE} AS avg_price
+                {SQL_JOIN}
+                GROUP BY h.location, wt.title
+                ORDER BY h.location, wt.title
+            ''')
+        if self.engine == 'rollup':
+            return self._sql_query(f'''
+                SELECT h.location AS location, wt.title AS weather_type,
+                       SUM(h.sum_price * w.n) / SUM(h.n_price * w.n) AS avg_price
+                {ROLLUP_JOIN}
+                JOIN weather.Weather_Type wt ON w.weather_type_id = wt.id
+                GROUP BY h.location, wt.title
+                ORDER BY h.location, wt.title
+            ''')
+        return self.get_merged_data().groupby(['location', 'weather_type']).agg(
+            avg_price=pd.NamedAgg(column='price', aggfunc='mean')
+        ).reset_index()
 
-        x = np.arange(len(stats['location']))
-        width = 0.35
+    def get_price_by_weather_type(self):
+        """Average price per weather type"""
+        if self.engine == 'streaming':
+            means = self.get_streaming_stats().weather_price.means()
+            return pd.DataFrame(list(means.items()), columns=['weather_type', 'avg_price'])
+        if self.engine == 'sql':
+            return self._sql_query(f'''
+                SELECT wt.title AS weather_type, {AVG_PRICE} AS avg_price
+                {SQL_JOIN}
+                GROUP BY wt.title
+                ORDER BY wt.title
+            ''')
+        if self.engine == 'rollup':
+            return self._sql_query(f'''
+                SELECT wt.title AS weather_type, SUM(h.sum_price * w.n) / SUM(h.n_price * w.n) AS avg_price
+                {ROLLUP_JOIN}
+                JOIN weather.Weather_Type wt ON w.weather_type_id = wt.id
+                GROUP BY wt.title
+                ORDER BY wt.title
+            ''')
+        return self.get_merged_data().groupby('weather_type').agg(
+            avg_price=pd.NamedAgg(column='price', aggfunc='mean')
+        ).reset_index()
 
-        fig, ax1 = plt.subplots()
-        ax1.bar(x - width/2, stats['price'], width, label='Avg Price')
-        ax1.set_xlabel('City')
-        ax1.set_ylabel('Average Hotel Price')
-        ax1.set_xticks(x)
-        ax1.set_xticklabels(stats['location'], rotation=45)
+    def get_price_by_temp(self):
+        """Average price per observed temperature, sorted by temperature"""
+        if self.engine == 'streaming':
+            means = self.get_streaming_stats().temp_price.means()
+            return pd.DataFrame(list(means.items()), columns=['temp', 'price'])
+        if self.engine in ('sql', 'rollup'):
+            return self._sql_query(f'''
+                SELECT wd.temp AS temp, {AVG_PRICE} AS price
+                {SQL_JOIN}
+                WHERE wd.temp IS NOT NULL
+                GROUP BY wd.temp
+                ORDER BY wd.temp
+            ''')
+        df = self.get_merged_data()
+        return df.groupby('temp').agg({'price': 'mean'}).reset_index().sort_values('temp')
+
+    def get_price_temp_points(self):
+        """(temp, price) pairs of every joined row
 
-        ax2 = ax1.twinx()
-        ax2.bar(x + width/2, stats['temp'], width, label='Avg Temperature')
-        ax2.set_ylabel('Average Temperature (°C)')
+        The streaming engine returns a fixed-size reservoir sample instead.
+        """
+        if self.engine == 'streaming':
+            return pd.DataFrame(self.get_streaming_stats().sample, columns=['temp', 'price'])
+        if self.engine in ('sql', 'rollup'):
+            return self._sql_query(f"SELECT wd.temp AS temp, h.price AS price {SQL_JOIN}")
+        return self.get_merged_data()[['temp', 'price']]
+
+    def get_temp_price_correlation(self):
+        """Pearson correlation between hotel price and temperature"""
+        if self.engine == 'streaming':
+            return self.get_streaming_stats().moments.correlation()
+        if self.engine == 'rollup':
+            return self._rollup_moments().correlation()
+        if self.engine == 'sql':
+            # Two passes (means, then centered co-moments) to avoid cancellation
+            pair_filter = "WHERE h.price IS NOT NULL AND wd.temp IS NOT NULL"
+            means = self._sql_query(f'''
+                SELECT SUM(h.scrapes) AS n, SUM(h.price * h.scrapes) / SUM(h.scrapes) AS mean_price,
+                       SUM(wd.temp * h.scrapes) / SUM(h.scrapes) AS mean_temp
+                {SQL_JOIN} {pair_filter}
+            ''').iloc[0]
+            if means['n'] < 2:
+                return float('nan')
+            mean_price, mean_temp = float(means['mean_price']), float(means['mean_temp'])
+            moments = self._sql_query(f'''
+                SELECT SUM((h.price - ?) * (h.price - ?) * h.scrapes) AS sxx,
+                       SUM((wd.temp - ?) * (wd.temp - ?) * h.scrapes) AS syy,
+                       SUM((h.price - ?) * (wd.temp - ?) * h.scrapes) AS sxy
+                {SQL_JOIN} {pair_filter}
+            ''', params=(mean_price, mean_price, mean_temp, mean_temp, mean_price, mean_temp)).iloc[0]
+            denominator = np.sqrt(moments['sxx'] * moments['syy'])
+            return float(moments['sxy'] / denominator) if denominator > 0 else float('nan')
+        df = self.get_merged_data()
+        return df['price'].corr(df['temp'])
 
-        ax1.legend(loc='upper left')
-        ax2.legend(loc='upper right')
+    def plot_price_by_weather(self, save_path='charts/price_by_weather.png'):
+        """Bar chart of average hotel price and temperature for each city"""
+        stats = self.get_city_stats()
+        if stats.empty:
+            print("No data available for price-by-weather plot.")
+            return
 
-        plt.title('Average Hotel Price and Temperature by City')
-        plt.tight_layout()
-        plt.savefig(save_path)
-        plt.close()
+        render_city_bars(frame_columns(stats), save_path)
         print(f"Saved bar chart to {save_path}")
         
     def plot_price_temp_scatter(self, save_path='charts/price_temp_scatter.png'):
         """Scatter plot of hotel price vs temperature for all hotels"""
-        df = self.get_merged_data()
+        df = self.get_price_temp_points()
         if df.empty:
             print("No data available for price-temp scatter plot.")
             return
 
-        plt.figure()
-        plt.scatter(df['temp'], df['price'])
-        plt.xlabel('Temperature (°C)')
-        plt.ylabel('Hotel Price')
-        plt.title('Hotel Price vs Temperature')
-        plt.tight_layout()
-        plt.savefig(save_path)
-        plt.close()
+        render_scatter(frame_columns(df), save_path)
         print(f"Saved scatter plot to {save_path}")
 
     def plot_price_temp_line(self, save_path='charts/price_temp_line.png'):
         """Line chart showing average hotel price by temperature"""
-        df = self.get_merged_data()
-        if df.empty:
+        temp_stats = self.get_price_by_temp()
+        if temp_stats.empty:
             print("No data available for price-temp line plot.")
             return
 
-        temp_stats = df.groupby('temp').agg({'price': 'mean'}).reset_index().sort_values('temp')
-
-        plt.figure()
-        plt.plot(temp_stats['temp'], temp_stats['price'])
-        plt.xlabel('Temperature (°C)')
-        plt.ylabel('Average Hotel Price')
-        plt.title('Average Hotel Price by Temperature')
-        plt.tight_layout()
-        plt.savefig(save_path)
-        plt.close()
+        render_line(frame_columns(temp_stats), save_path)
         print(f"Saved line chart to {save_path}")
+
+    def build_chart_dataset(self):
+        """Every input the charts need, computed once as plain column dicts"""
+        return {
+            'city_stats': frame_columns(self.get_city_stats()),
+            'price_temp_points': frame_columns(self.get_price_temp_points()),
+            'price_by_temp': frame_columns(self.get_price_by_temp()),
+        }
         
     def analyze_price_by_weather_condition(self):
         """Calculate average hotel price per city for different weather conditions."""
-        df = self.get_merged_data()
-        if df.empty:
+        weather_stats = self.get_price_by_location_weather()
+        if weather_stats.empty:
             print("No data available for price-by-weather-condition analysis.")
             return
 
-        weather_stats = df.groupby(['location', 'weather_type']).agg(
-            avg_price=pd.NamedAgg(column='price', aggfunc='mean')
-        ).reset_index()
-
         print("\nANALYSIS: Average Hotel Price per City for Different Weather Conditions\n")
         for _, row in weather_stats.iterrows():
             print(f"{row['location']} ({row['weather_type']}): Avg Price = ${row['avg_price']:.2f}")
 
     def analyze_temp_price_correlation(self):
         """Perform correlation analysis between temperature and hotel prices."""
-        df = self.get_merged_data()
-        if df.empty:
+        if not self.has_data():
             print("No data available for temperature-price correlation analysis.")
             return
 
-        correlation = df['price'].corr(df['temp'])
+        correlation = self.get_temp_price_correlation()
         print("\nANALYSIS: Correlation Between Temperature and Hotel Prices\n")
         print(f"Correlation coefficient: {correlation:.2f}")
 
     def analyze_weather_impact_on_pricing(self):
         """Analyze the impact of weather conditions on hotel pricing."""
-        df = self.get_merged_data()
-        if df.empty:
+        weather_impact = self.get_price_by_weather_type()
+        if weather_impact.empty:
             print("No data available for weather impact analysis.")
             return
 
-        weather_impact = df.groupby('weather_type').agg(
-            avg_price=pd.NamedAgg(column='price', aggfunc='mean')
-        ).reset_index()
-
         print("\nANALYSIS: Impact of Weather Conditions on Hotel Pricing\n")
         for _, row in weather_impact.iterrows():
             print(f"{row['weather_type']}: Avg Price = ${row['avg_price']:.2f}")
 
-    def generate_all_visualizations(self):
-        """Helper to generate all charts"""
-        self.plot_price_by_weather()
-        self.plot_price_temp_scatter()
-        self.plot_price_temp_line()
+    def generate_all_visualizations(self, jobs=None, workers=None, force=False, charts_dir='charts'):
+        """Helper to generate all charts
+
+        The chart inputs are computed once and the jobs rendered in a process
+        pool (workers=None uses every core). Charts whose inputs match the
+        manifest in charts_dir are left as they are unless force=True.
+        """
+        jobs = jobs if jobs is not None else default_chart_jobs(charts_dir)
+        dataset = self.build_chart_dataset()
+        ready = []
+        for job in jobs:
+            if any(len(values) for values in dataset[job.data_key].values()):
+                ready.append(job)
+            else:
+                print(f"No data available for {job.save_path}.")
+
+        with METRICS.span('render_charts'):
+            rendered, skipped = render_charts(ready, dataset, workers=workers, force=force,
+                                              manifest_path=os.path.join(charts_dir, MANIFEST_FILE))
+        METRICS.incr('charts_rendered', len(rendered))
+        METRICS.incr('charts_skipped', len(skipped))
+        for path in rendered:
+            print(f"Saved chart to {path}")
+        for path in skipped:
+            print(f"Chart unchanged, skipped {path}")
 
     def run_analysis(self):
         """Run all analyses and print detailed results."""
         print("\n===== WEATHER-OR-NOT ANALYSIS RESULTS =====\n")
-        merged_df = self.get_merged_data()
-        if merged_df.empty:
+        if not self.has_data():
             print("No merged data available for analysis.")
             return
 
         # Analysis 1: Average hotel price and temperature by city
         print("ANALYSIS 1: Average Hotel Price and Temperature by City\n")
-        city_stats = merged_df.groupby('location').agg(
-            avg_price=pd.NamedAgg(column='price', aggfunc='mean'),
-            avg_temp=pd.NamedAgg(column='temp', aggfunc='mean')
-        )
-        for city, row in city_stats.iterrows():
-            print(f"{city}: Avg Price = ${row['avg_price']:.2f}, Avg Temp = {row['avg_temp']:.1f}°C")
+        city_stats = self.get_city_stats()
+        for _, row in city_stats.iterrows():
+            print(f"{row['location']}: Avg Price = ${row['avg_price']:.2f}, Avg Temp = {row['avg_temp']:.1f}°C")
         print()
 
         # Analysis 2: Temperature and hotel price correlation
         print("ANALYSIS 2: Temperature and Hotel Price Correlation\n")
-        corr = merged_df['price'].corr(merged_df['temp'])
+        corr = self.get_temp_price_correlation()
         print(f"Correlation coefficient between temperature and hotel price: {corr:.2f}\n")
 
         self.analyze_price_by_weather_condition()
@@ -0,0 +1,393 @@
+import argparse
+import glob
+import json
+import os
+import random
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+"""
+Offline benchmarks for the scrape, ingest and analysis hot paths.
+
+Every stage of the main.py pipeline runs against synthetic fixtures (or
+recorded ones from --fixtures-dir: *.html Booking pages and *.json OWM history
+payloads) at each requested size. Wall time, rows/s and peak traced memory are
+reported per stage and size, optionally saved as a baseline and compared
+against one. The run exits with status 1 when a stage is slower than the
+baseline by more than --threshold.
+
+Usage:
+    python FP_benchmark.py --sizes 1k,10k,100k
+    python FP_benchmark.py --sizes 1k,10k --save-baseline benchmark_baseline.json
+    python FP_benchmark.py --sizes 1k,10k --baseline benchmark_baseline.json --threshold 0.25
+"""
+
+CITIES = ["Detroit", "New York", "Chicago", "Miami", "Los Angeles"]
+WEATHER_MAINS = ["Clear", "Clouds", "Rain", "Snow", "Mist", "Thunderstorm", "Drizzle"]
+HOTEL_STAGE_MAX_ROWS = 100000  # larger HTML pages are not realistic
+# Stages reported as a speedup over the stage they replaced
+REFERENCE_STAGES = {'parse_history': 'parse_history_rows'}
+
+
+def parse_size(text):
+    """'10k' -> 10000, '1m' -> 1000000"""
+    text = text.strip().lower()
+    multiplier = {'k': 1000, 'm': 1000000}.get(text[-1:], 1)
+    return int(float(text.rstrip('km')) * multiplier)
+
+
+def synthetic_booking_html(num_cards, seed=0):
+    rng = random.Random(seed)
+    cards = []
+    for i in range(num_cards):
+        cards.append(
+            '<div data-testid="property-card">'
+            f'<div data-testid="title">Hotel {i}</div>'
+            f'<span data-testid="price-and-discounted-price">$ {rng.randint(60, 900):,}</span>'
+            f'<div data-testid="review-score"><div>Scored {rng.uniform(5, 10):.1f}</div>'
+            f'<div>{rng.randint(1, 20000):,} reviews</div></div>'
+            '</div>'
+        )
+    return '<html><body><div id="results">' + ''.join(cards) + '</div></body></html>'
+
+
+def synthetic_owm_payload(num_hours, start_ts=1744156800, seed=0):
+    rng = random.Random(seed)
+    entries = []
+    for i in range(num_hours):
+        main = rng.choice(WEATHER_MAINS)
+        entries.append({
+            "dt": start_ts + i * 3600,
+            "main": {"temp": round(rng.uniform(-10, 40), 2), "humidity": rng.randint(20, 100)},
+            "wind": {"speed": round(rng.uniform(0, 35), 2)},
+            "weather": [{"main": main, "description": main.lower()}]
+        })
+    return {"list": entries}
+
+
+def parse_history_rows(data, city):
+    """
+    The per-entry parser that parse_history_columns replaced: one dict per
+    entry, formatted and flagged one at a time. Kept as its reference.
+    """
+    from FP_weather_request import is_extreme_weather
+    results = []
+    for entry in data.get("list", []):
+        results.append({
+            "city": city,
+            "datetime": datetime.utcfromtimestamp(entry.get("dt", 0)).strftime('%Y-%m-%d %H:%M:%S'),
+            "temp": entry.get("main", {}).get("temp"),
+            "humidity": entry.get("main", {}).get("humidity"),
+            "weather": entry.get("weather", [{}])[0].get("main", ""),
+            "description": entry.get("weather", [{}])[0].get("description", ""),
+            "wind_speed": entry.get("wind", {}).get("speed"),
+            "is_extreme": int(is_extreme_weather(entry))
+        })
+    return results
+
+
+def synthetic_cache_entries(num_rows, seed=0):
+    """
+    Yields (cache key, entry) pairs spread over CITIES, hourly from
+    2025-01-01. Entries are generated as they are consumed, so large sizes
+    never sit in memory at once.
+    """
+    rng = random.Random(seed)
+    start = datetime(2025, 1, 1)
+    per_city = -(-num_rows // len(CITIES))
+    produced = 0
+    for city in CITIES:
+        for i in range(per_city):
+            if produced >= num_rows:
+                return
+            dt = (start + timedelta(hours=i)).strftime('%Y-%m-%d %H:%M:%S')
+            main = rng.choice(WEATHER_MAINS)
+            produced += 1
+            yield f"{city.lower().replace(' ', '_')}_{dt}", {
+                "city": city, "datetime": dt, "temp": round(rng.uniform(-10, 40), 2),
+                "humidity": rng.randint(20, 100), "weather": main, "description": main.lower(),
+                "wind_speed": round(rng.uniform(0, 35), 2), "is_extreme": 0
+            }
+
+
+def synthetic_weather_entries(num_rows, seed=0):
+    """The entries of synthetic_cache_entries without their keys"""
+    return (entry for _, entry in synthetic_cache_entries(num_rows, seed))
+
+
+def load_recorded_fixtures(fixtures_dir):
+    """Recorded Booking pages and OWM payloads, if a fixtures directory was given"""
+    pages, payloads = [], []
+    if fixtures_dir:
+        for path in sorted(glob.glob(os.path.join(fixtures_dir, '*.html'))):
+            with open(path, 'r', encoding='utf-8') as f:
+                pages.append(f.read())
+        for path in sorted(glob.glob(os.path.join(fixtures_dir, '*.json'))):
+            with open(path, 'r', encoding='utf-8') as f:
+                payloads.append(json.load(f))
+    return pages, payloads
+
+
+def build_weather_db(path):
+    from FP_weather_database import set_up_database, create_weather_type_table, create_weather_data_table
+    cur, conn = set_up_database(path)
+    create_weather_type_table(cur, conn)
+    create_weather_data_table(cur, conn)
+    return cur, conn
+
+
+def build_hotel_db(path, num_rows, seed=0):
+    from FP_schema import apply_pragmas, ensure_hotel_schema
+    from FP_rollup import refresh_hotel_rollup
+    from FP_price_history import record_observations
+    rng = random.Random(seed)
+    conn = sqlite3.connect(path)
+    apply_pragmas(conn)
+    ensure_hotel_schema(conn)
+    days = max(1, num_rows // (len(CITIES) * 24))
+    rows = [
+        (f"Hotel {i}", rng.choice(CITIES), float(rng.randint(60, 900)), round(rng.uniform(5, 10), 1),
+         rng.randint(1, 20000), '2025-01-01',
+         (datetime(2025, 1, 1) + timedelta(days=rng.randrange(days))).strftime('%Y-%m-%d'))
+        for i in range(num_rows // 24 or 1)
+    ]
+    with conn:
+        record_observations(conn, rows)
+        refresh_hotel_rollup(conn)
+    conn.close()
+
+
+class Stages:
+    """Each stage is (setup(size) -> state, run(state) -> rows processed)"""
+
+    def __init__(self, workdir, fixtures_dir=None):
+        self.workdir = workdir
+        self.pages, self.payloads = load_recorded_fixtures(fixtures_dir)
+
+    def setup_parse_hotels(self, size):
+        if size > HOTEL_STAGE_MAX_ROWS:
+            return None
+        if self.pages:
+            return self.pages
+        return [synthetic_booking_html(25, seed=i) for i in range(max(1, size // 25))]
+
+    def run_parse_hotels(self, pages):
+        from FP_hotel_parser import parse_hotels_html
+        return sum(len(parse_hotels_html(html, "Detroit", "2025-04-22")) for html in pages)
+
+    def setup_parse_history(self, size):
+        if self.payloads:
+            return self.payloads
+        return [synthetic_owm_payload(min(168, size - start), start_ts=1744156800 + start * 3600)
+                for start in range(0, size, 168)]
+
+    def run_parse_history(self, payloads):
+        from FP_weather_request import parse_history_columns
+        return sum(len(parse_history_columns(payload, "Detroit")["datetime"]) for payload in payloads)
+
+    def run_parse_history_rows(self, payloads):
+        return sum(len(parse_history_rows(payload, "Detroit")) for payload in payloads)
+
+    def setup_cache_update(self, size):
+        path = os.path.join(self.workdir, f'cache_{size}.db')
+        if os.path.exists(path):
+            os.remove(path)
+        return path, synthetic_cache_entries(size)
+
+    def run_cache_update(self, state):
+        from FP_weather_cache import WeatherCache
+        path, entries = state
+        with WeatherCache(path) as cache:
+            return cache.add_many(entries)
+
+    def setup_ingest(self, size):
+        path = os.path.join(self.workdir, f'weather_ingest_{size}.db')
+        if os.path.exists(path):
+            os.remove(path)
+        cur, conn = build_weather_db(path)
+        return cur, conn, synthetic_weather_entries(size)
+
+    def run_ingest(self, state):
+        from FP_weather_database import insert_weather_data
+        cur, conn, entries = state
+        count = insert_weather_data(cur, conn, entries)
+        conn.close()
+        return count
+
+    def _analysis_dbs(self, size):
+        weather_path = os.path.join(self.workdir, f'weather_analysis_{size}.db')
+        hotel_path = os.path.join(self.workdir, f'hotels_analysis_{size}.db')
+        if not os.path.exists(weather_path):
+            from FP_weather_database import insert_weather_data
+            cur, conn = build_weather_db(weather_path)
+            insert_weather_data(cur, conn, synthetic_weather_entries(size))
+            conn.close()
+        if not os.path.exists(hotel_path):
+            build_hotel_db(hotel_path, size)
+        return hotel_path, weather_path
+
+    def _run_engine(self, state, engine):
+        from FP_analyzer import WeatherHotelAnalyzer
+        hotel_path, weather_path = state
+        analyzer = WeatherHotelAnalyzer(hotel_db_path=hotel_path, weather_db_path=weather_path, engine=engine)
+        try:
+            analyzer.get_city_stats()
+            analyzer.get_price_by_location_weather()
+            analyzer.get_price_by_weather_type()
+            analyzer.get_temp_price_correlation()
+        finally:
+            analyzer.close()
+        conn = sqlite3.connect(weather_path)
+        try:
+            return conn.execute("SELECT COUNT(*) FROM Weather_Data").fetchone()[0]
+        finally:
+            conn.close()
+
+    def setup_analysis(self, size):
+        return self._analysis_dbs(size)
+
+    def run_merge_pandas(self, state):
+        return self._run_engine(state, 'pandas')
+
+    def run_merge_sql(self, state):
+        return self._run_engine(state, 'sql')
+
+    def run_merge_streaming(self, state):
+        return self._run_engine(state, 'streaming')
+
+    def run_merge_rollup(self, state):
+        return self._run_engine(state, 'rollup')
+
+    def all(self):
+        return {
+            'parse_hotels': (self.setup_parse_hotels, self.run_parse_hotels),
+            'parse_history_rows': (self.setup_parse_history, self.run_parse_history_rows),
+            'parse_history': (self.setup_parse_history, self.run_parse_history),
+            'cache_update': (self.setup_cache_update, self.run_cache_update),
+            'ingest': (self.setup_ingest, self.run_ingest),
+            'analysis_pandas': (self.setup_analysis, self.run_merge_pandas),
+            'analysis_sql': (self.setup_analysis, self.run_merge_sql),
+            'analysis_streaming': (self.setup_analysis, self.run_merge_streaming),
+            'analysis_rollup': (self.setup_analysis, self.run_merge_rollup),
+        }
+
+
+def measure(run, state, trace_memory=True):
+    """Time one call; returns (seconds, rows, peak traced MB)"""
+    if trace_memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    rows = run(state)
+    seconds = time.perf_counter() - start
+    peak_mb = 0.0
+    if trace_memory:
+        peak_mb = tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+        tracemalloc.stop()
+    return seconds, rows, peak_mb
+
+
+def run_benchmarks(sizes, stage_names=None, fixtures_dir=None, repeat=1, trace_memory=True):
+    """Run the selected stages at each size; returns {'stage@size': result dict}"""
+    results = {}
+    workdir = tempfile.mkdtemp(prefix='fp_bench_')
+    try:
+        stages = Stages(workdir, fixtures_dir).all()
+        for name, (setup, run) in stages.items():
+            if stage_names and name not in stage_names:
+                continue
+            for size in sizes:
+                key = f"{name}@{size}"
+                try:
+                    timings = []
+                    for _ in range(repeat):
+                        state = setup(size)
+                        if state is None:
+                            break
+                        timings.append(measure(run, state, trace_memory))
+                except ImportError as e:
+                    print(f"{key:<28} skipped (missing dependency: {e.name})")
+                    break
+                if not timings:
+                    continue
+                seconds, rows, peak_mb = min(timings)
+                results[key] = {
+                    'seconds': seconds,
+                    'rows': rows,
+                    'rows_per_s': rows / seconds if seconds > 0 else 0.0,
+                    'peak_mb': peak_mb
+                }
+                print(f"{key:<28} {seconds:9.3f}s {results[key]['rows_per_s']:14,.0f} rows/s {peak_mb:9.1f} MB")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+
+def compare_to_baseline(results, baseline, threshold):
+    """Returns the list of regressions: stages slower than baseline by more than threshold"""
+    regressions = []
+    for key, result in results.items():
+        previous = baseline.get(key)
+        if not previous or previous['seconds'] <= 0:
+            continue
+        change = result['seconds'] / previous['seconds'] - 1
+        status = "REGRESSION" if change > threshold else "ok"
+        print(f"{key:<28} {previous['seconds']:9.3f}s -> {result['seconds']:9.3f}s ({change:+.1%}) {status}")
+        if change > threshold:
+            regressions.append((key, change))
+    return regressions
+
+
+def compare_to_reference(results):
+    """Prints each REFERENCE_STAGES stage's speedup over its reference at every size both ran"""
+    for key, result in results.items():
+        name, _, size = key.partition('@')
+        reference = results.get(f"{REFERENCE_STAGES.get(name)}@{size}")
+        if reference and result['seconds'] > 0:
+            speedup = reference['seconds'] / result['seconds']
+            print(f"{key:<28} {speedup:9.2f}x vs {REFERENCE_STAGES[name]}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the Weather-or-Not pipeline stages offline.")
+    parser.add_argument('--sizes', default='1k,10k', help="comma-separated row counts, e.g. 1k,10k,1m,10m")
+    parser.add_argument('--stages', default='', help="comma-separated stage names (default: all)")
+    parser.add_argument('--fixtures-dir', default=None, help="directory with recorded *.html and *.json fixtures")
+    parser.add_argument('--repeat', type=int, default=1, help="runs per stage; the fastest is kept")
+    parser.add_argument('--no-memory', action='store_true', help="skip tracemalloc (faster, no peak memory)")
+    parser.add_argument('--baseline', default=None, help="baseline JSON to compare against")
+    parser.add_argument('--save-baseline', default=None, help="write this run's results as a baseline")
+    parser.add_argument('--threshold', type=float, default=0.2, help="allowed slowdown before failing (0.2 = 20%%)")
+    args = parser.parse_args(argv)
+
+    sizes = [parse_size(size) for size in args.sizes.split(',') if size.strip()]
+    stage_names = [name.strip() for name in args.stages.split(',') if name.strip()] or None
+
+    print(f"{'stage@size':<28} {'wall':>10} {'throughput':>21} {'peak':>12}")
+    results = run_benchmarks(sizes, stage_names, args.fixtures_dir, args.repeat, not args.no_memory)
+    if any(key.partition('@')[0] in REFERENCE_STAGES for key in results):
+        print()
+        compare_to_reference(results)
+
+    if args.save_baseline:
+        with open(args.save_baseline, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=4)
+        print(f"\nSaved baseline to {args.save_baseline}")
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        print(f"\nComparing against {args.baseline} (threshold {args.threshold:.0%})")
+        regressions = compare_to_baseline(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} stage(s) regressed past the threshold.")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,175 @@
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+"""
+Chart rendering for WeatherHotelAnalyzer.
+
+Charts are drawn with matplotlib's object-oriented Figure API on the Agg
+canvas, so no pyplot global state is touched and renderers are safe to run in
+worker processes. The analyzer precomputes one dataset (a dict of named
+column dicts) and describes each chart as a ChartJob naming a renderer and a
+dataset entry. render_charts ships the dataset to each worker once, renders
+the jobs in a process pool and records a hash of every chart's inputs in a
+manifest, so charts whose inputs have not changed are skipped on the next run.
+"""
+
+# Bump when a renderer's output changes, so existing charts are redrawn
+RENDERER_VERSION = 1
+MANIFEST_FILE = '.chart_manifest.json'
+
+_worker_dataset = None
+
+
+def _new_figure():
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    fig = Figure()
+    FigureCanvasAgg(fig)
+    return fig
+
+
+def render_city_bars(data, save_path, title='Average Hotel Price and Temperature by City'):
+    """Bar chart of average hotel price and temperature for each city"""
+    import numpy as np
+
+    x = np.arange(len(data['location']))
+    width = 0.35
+
+    fig = _new_figure()
+    ax1 = fig.add_subplot()
+    ax1.bar(x - width/2, data['avg_price'], width, label='Avg Price')
+    ax1.set_xlabel('City')
+    ax1.set_ylabel('Average Hotel Price')
+    ax1.set_xticks(x)
+    ax1.set_xticklabels(data['location'], rotation=45)
+
+    ax2 = ax1.twinx()
+    ax2.bar(x + width/2, data['avg_temp'], width, label='Avg Temperature')
+    ax2.set_ylabel('Average Temperature (°C)')
+
+    ax1.legend(loc='upper left')
+    ax2.legend(loc='upper right')
+
+    ax1.set_title(title)
+    fig.tight_layout()
+    fig.savefig(save_path)
+
+
+def render_scatter(data, save_path, title='Hotel Price vs Temperature'):
+    """Scatter plot of hotel price vs temperature"""
+    fig = _new_figure()
+    ax = fig.add_subplot()
+    ax.scatter(data['temp'], data['price'])
+    ax.set_xlabel('Temperature (°C)')
+    ax.set_ylabel('Hotel Price')
+    ax.set_title(title)
+    fig.tight_layout()
+    fig.savefig(save_path)
+
+
+def render_line(data, save_path, title='Average Hotel Price by Temperature'):
+    """Line chart of average hotel price by temperature"""
+    fig = _new_figure()
+    ax = fig.add_subplot()
+    ax.plot(data['temp'], data['price'])
+    ax.set_xlabel('Temperature (°C)')
+    ax.set_ylabel('Average Hotel Price')
+    ax.set_title(title)
+    fig.tight_layout()
+    fig.savefig(save_path)
+
+
+RENDERERS = {
+    'city_bars': render_city_bars,
+    'scatter': render_scatter,
+    'line': render_line,
+}
+
+
+class ChartJob:
+    def __init__(self, kind, data_key, save_path, title=None):
+        """One chart: a renderer name, the dataset entry it draws and its output path"""
+        if kind not in RENDERERS:
+            raise ValueError(f"Unknown chart kind '{kind}', expected one of {sorted(RENDERERS)}")
+        self.kind = kind
+        self.data_key = data_key
+        self.save_path = save_path
+        self.title = title
+
+    def render(self, dataset):
+        kwargs = {'title': self.title} if self.title else {}
+        RENDERERS[self.kind](dataset[self.data_key], self.save_path, **kwargs)
+
+    def input_hash(self, dataset):
+        """Hash of everything that determines the chart's pixels"""
+        payload = json.dumps(
+            [RENDERER_VERSION, self.kind, self.title, dataset[self.data_key]],
+            sort_keys=True, default=str
+        )
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def load_manifest(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_manifest(path, manifest):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=4, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def _init_worker(dataset):
+    global _worker_dataset
+    _worker_dataset = dataset
+
+
+def _render_in_worker(job):
+    job.render(_worker_dataset)
+    return job.save_path
+
+
+def render_charts(jobs, dataset, workers=None, manifest_path=None, force=False):
+    """
+    Renders every job whose inputs changed since the last run.
+    workers=None uses one process per core; workers <= 1 renders inline.
+    Returns (rendered_paths, skipped_paths).
+    """
+    manifest = load_manifest(manifest_path) if manifest_path else {}
+    hashes = {job.save_path: job.input_hash(dataset) for job in jobs}
+    todo = [
+        job for job in jobs
+        if force or manifest.get(job.save_path) != hashes[job.save_path] or not os.path.exists(job.save_path)
+    ]
+    skipped = [job.save_path for job in jobs if job not in todo]
+
+    directories = {os.path.dirname(job.save_path) for job in todo}
+    if manifest_path:
+        directories.add(os.path.dirname(manifest_path))
+    for directory in directories:
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    rendered = []
+    if (workers is not None and workers <= 1) or len(todo) <= 1:
+        for job in todo:
+            job.render(dataset)
+            rendered.append(job.save_path)
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(dataset,)) as executor:
+            rendered = list(executor.map(_render_in_worker, todo))
+
+    if manifest_path:
+        for path in rendered:
+            manifest[path] = hashes[path]
+        save_manifest(manifest_path, manifest)
+    return rendered, skipped
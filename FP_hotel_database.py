@@ -1,16 +1,61 @@
 import requests
-from bs4 import BeautifulSoup
 import time
 import random
 import sqlite3
-import pandas as pd
-import re
 from datetime import datetime, timedelta
 import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, FIRST_COMPLETED, wait
+from FP_http_client import get_session, is_rate_limited
+from FP_hotel_parser import parse_hotels_html
+from FP_schema import apply_pragmas, ensure_hotel_schema
+from FP_ingest_state import create_ingest_state_table, get_high_water_mark, set_high_water_mark
+from FP_metrics import METRICS
+from FP_rollup import refresh_hotel_rollup
+from FP_hotel_store import HotelObservations
+from FP_price_history import record_observations, forget_scrapes, get_price_history
+from FP_hotel_query import HotelQuery, HOTEL_COLUMNS
+
+
+class TokenBucketRateLimiter:
+    def __init__(self, rate=1.0, capacity=1):
+        """Allow `rate` requests per second on average with bursts of up to `capacity`"""
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.capacity = max(1, capacity)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a token is available, then consume it"""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
 
 class BookingScraper:
-    def __init__(self, db_path='weather_hotel_data.db'):
-        """Initialize the scraper with headers and database connection"""
+    def __init__(self, db_path='weather_hotel_data.db', rate_limiter=None, session=None, reset=False,
+                 parser_backend='html.parser', cards_only=False, response_cache=None):
+        """Initialize the scraper with headers and database connection
+
+        Existing hotel history is kept unless reset=True. parser_backend and
+        cards_only are passed to FP_hotel_parser.parse_hotels_html. An optional
+        FP_response_cache.ResponseCache serves fresh pages without a request.
+        """
+        self.response_cache = response_cache
+        self.parser_backend = parser_backend
+        self.cards_only = cards_only
+        self.rate_limiter = rate_limiter
+        self.session = session or get_session()
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
             'Accept-Language': 'en-US,en;q=0.9',
@@ -19,31 +64,26 @@ class BookingScraper:
             'Referer': 'https://www.booking.com/'
         }
 
-        if os.path.exists(db_path):
+        if reset and os.path.exists(db_path):
             print(f"Removing old database: {db_path}")
             os.remove(db_path)
 
+        self.db_path = db_path
         self.conn = sqlite3.connect(db_path)
         self.cursor = self.conn.cursor()
+        self._query = None
 
-        self.cursor.execute('''
-        CREATE TABLE IF NOT EXISTS hotels (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            hotel_name TEXT,
-            location TEXT,
-            price REAL,
-            rating REAL,
-            review_count INTEGER,
-            scrape_date TEXT,
-            check_in_date TEXT
-        )
-        ''')
-        self.conn.commit()
+        apply_pragmas(self.conn)
+        ensure_hotel_schema(self.conn)
+        create_ingest_state_table(self.cursor, self.conn)
         print(f"Database initialized: {db_path}")
 
 
-    def generate_booking_url(self, city, check_in_date=None, check_out_date=None):
-        """Generate a URL for Booking.com search results"""
+    def generate_booking_url(self, city, check_in_date=None, check_out_date=None, offset=0):
+        """Generate a URL for Booking.com search results
+
+        offset selects a later results page (Booking.com pages by 25 properties).
+        """
         if not check_in_date:
             check_in_date = (datetime.now() + timedelta(days=1)).strftime('%Y-%m-%d')
         if not check_out_date:
@@ -57,185 +97,247 @@ class BookingScraper:
                f"checkout={check_out_date}&"
                f"group_adults=1&no_rooms=1&"
                f"aid=304142&label=gen173nr-1FCAEoggI46AdIM1gEaJsCiAEBmAExuAEHyAEM2AEB6AEB-AECiAIBqAIDuAKGtJvABsACAdICJDc3MTAxODk3LThjMTEtNDM3Ni1hNGUxLWM2YjkxODhlOGQ4NNgCBeACAQ") 
+        if offset:
+            url += f"&offset={offset}"
         return url
 
     def fetch_page(self, url):
         """Fetch the HTML content of a page with politeness delay"""
-        try:
-            sleep_time = random.uniform(5, 7)
-            print(f"Waiting for {sleep_time:.2f} seconds before fetching...")
-            time.sleep(sleep_time)
+        if self.response_cache:
+            cached = self.response_cache.get(url)
+            if cached is not None:
+                METRICS.incr('cache_hits', cache='html')
+                print(f"Using cached page for {url}")
+                return cached
+            METRICS.incr('cache_misses', cache='html')
 
-            response = requests.get(url, headers=self.headers)
+        try:
+            with METRICS.span('fetch_sleep', source='booking'):
+                if self.rate_limiter:
+                    self.rate_limiter.acquire()
+                else:
+                    sleep_time = random.uniform(5, 7)
+                    print(f"Waiting for {sleep_time:.2f} seconds before fetching...")
+                    time.sleep(sleep_time)
+
+            METRICS.incr('requests', source='booking')
+            with METRICS.span('http_request', source='booking'):
+                response = self.session.get(url, headers=self.headers)
+            METRICS.incr('response_bytes', len(response.content), source='booking')
             response.raise_for_status() 
-            time.sleep(random.uniform(1, 3))
+            if not self.rate_limiter:
+                with METRICS.span('fetch_sleep', source='booking'):
+                    time.sleep(random.uniform(1, 3))
+            if self.response_cache:
+                self.response_cache.put(url, response.text)
             return response.text
         except requests.exceptions.RequestException as e:
+            METRICS.incr('request_errors', source='booking')
+            if is_rate_limited(e):
+                METRICS.incr('rate_limited', source='booking')
             print(f"Error fetching page {url}: {e}")
             return None
 
     def parse_hotels(self, html_content, city, check_in_date):
         """Parse hotel information from HTML content"""
-        if not html_content:
-            print("No HTML content to parse.")
-            return []
-
-        soup = BeautifulSoup(html_content, 'html.parser')
-        hotels_data = []
-
-        hotel_containers = soup.select('div[data-testid="property-card"]')
-
-        if not hotel_containers:
-            print("No hotel containers found with the specified selector.")
-            hotel_containers = soup.select('div.c624d7469d.a0e60936ad.a3214e5942.b0db0e8ada')
-            if not hotel_containers:
-                 print("No hotel containers found even with the fallback selector.")
-
-        for i, hotel in enumerate(hotel_containers):
-            try:
-
-                hotel_name_elem = hotel.select_one('div[data-testid="title"]')
-                if not hotel_name_elem:
-                     hotel_name_elem = hotel.select_one('div.f6431b446c.a15b38c233')
-
-                hotel_name = hotel_name_elem.text.strip() if hotel_name_elem else "Unknown"
-
-                location = city
-
-                price_element = hotel.select_one('[data-testid="price-and-discounted-price"]')
-
-                price = 0.0
-
-                if price_element:
-                    price_text = price_element.get_text(strip=True)
-
-                    price_match = re.search(r'[\d,.]+', price_text)
+        with METRICS.span('parse', city=city):
+            return parse_hotels_html(html_content, city, check_in_date, self.parser_backend, self.cards_only)
 
-                    if price_match:
-                         price_str = price_match.group(0)
-                         price = float(price_str.replace(',', ''))
-                
-                rating_elem = hotel.select_one('div.a3b8729ab1.d86cee9b25')
-                if not rating_elem:
-                     rating_elem = hotel.select_one('div[data-testid="review-score"]')
+    def save_to_db(self, hotels_data, replace=False):
+        """Save hotel data to the database
 
-                rating = 0.0
-                if rating_elem:
-                    rating_text = rating_elem.text.strip()
-                    rating_match = re.search(r'(\d+(\.\d+)?)$', rating_text)
-                    if rating_match:
-                        rating = float(rating_match.group(1))
+        Accepts hotel dicts or a HotelObservations store. Rows are recorded in
+        the price history (FP_price_history), which the hotels view reads; if
+        the batch fails, rows are retried one by one so a bad row does not drop
+        the rest. Returns the number of rows that started or extended a run.
 
-                review_count_elem = hotel.select_one('div.abf093bdfe.f45d8e4c32.d935416c47') 
-                if not review_count_elem:
-                    review_count_elem = hotel.select_one('div[data-testid="review-score"] div:last-child')
-
-                review_count = 0
-                if review_count_elem:
-                    review_text = review_count_elem.text.strip()
-                    review_count_match = re.search(r'\d{1,3}(?:,\d{3})*', review_text.replace('.', ''))
-                    if review_count_match:
-                         review_count = int(review_count_match.group(0).replace(',', ''))
-
-                hotels_data.append({
-                    'hotel_name': hotel_name,
-                    'location': location,
-                    'price': price,
-                    'rating': rating,
-                    'review_count': review_count,
-                    'scrape_date': datetime.now().strftime('%Y-%m-%d'),
-                    'check_in_date': check_in_date
-                })
-
-            except Exception as e:
-                print(f"Error parsing hotel container {i+1}: {e}")
-                continue 
-
-        return hotels_data
-
-    def save_to_db(self, hotels_data):
-        """Save hotel data to the database"""
+        With replace=True, whatever was recorded earlier for the same
+        (location, check_in_date, scrape_date) pages is removed first, in the
+        same transaction, so saving a page again replaces it.
+        """
         if not hotels_data:
             print("No hotel data to save")
             return 0
 
-        count = 0
-        for hotel in hotels_data:
-            try:
-                self.cursor.execute('''
-                INSERT INTO hotels (hotel_name, location, price, rating, review_count, scrape_date, check_in_date)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-                ''', (
-                    hotel['hotel_name'],
-                    hotel['location'],
-                    hotel['price'],
-                    hotel['rating'],
-                    hotel['review_count'],
-                    hotel['scrape_date'],
-                    hotel['check_in_date']
-                ))
-                count += 1
-            except sqlite3.Error as e:
-                print(f"Database error saving hotel {hotel.get('hotel_name', 'Unknown')}: {e}")
-                continue
+        if not isinstance(hotels_data, HotelObservations):
+            hotels_data = HotelObservations.from_dicts(hotels_data)
 
+        replaced = [key for key in hotels_data.scrape_keys() if all(key)] if replace else []
+        try:
+            forget_scrapes(self.conn, replaced)
+            new_runs, extended = record_observations(self.conn, hotels_data.rows())
+        except sqlite3.Error:
+            self.conn.rollback()
+            forget_scrapes(self.conn, replaced)
+            new_runs = extended = 0
+            for row in hotels_data.rows():
+                try:
+                    started, stretched = record_observations(self.conn, [row])
+                except sqlite3.Error as e:
+                    print(f"Database error saving hotel {row[0] or 'Unknown'}: {e}")
+                    continue
+                new_runs += started
+                extended += stretched
+        count = new_runs + extended
+
+        refresh_hotel_rollup(self.conn, [
+            (location, check_in_date) for location, check_in_date in hotels_data.day_keys()
+            if location and check_in_date
+        ])
         self.conn.commit()
+        METRICS.incr('price_runs_started', new_runs)
+        METRICS.incr('price_runs_extended', extended)
+        METRICS.incr('rows_inserted', count, table='price_observation')
+        METRICS.incr('rows_skipped', len(hotels_data) - count, table='price_observation')
         return count
 
-    def scrape_city(self, city, check_in_date=None, check_out_date=None):
-        """Scrape hotel data for a specific city"""
+    def fetch_city_page(self, city, check_in_date=None, check_out_date=None):
+        """Fetch the results page for a city; returns (html, effective check-in date)"""
         print(f"\n--- Scraping hotels for {city} ({check_in_date} to {check_out_date}) ---")
 
         url = self.generate_booking_url(city, check_in_date, check_out_date)
 
-        html_content = self.fetch_page(url)
+        with METRICS.span('fetch_city', city=city):
+            html_content = self.fetch_page(url)
 
         effective_check_in_date = check_in_date or (datetime.now() + timedelta(days=1)).strftime('%Y-%m-%d')
 
-        hotels_data = self.parse_hotels(html_content, city, effective_check_in_date)
-
-        saved_count = self.save_to_db(hotels_data)
+        return html_content, effective_check_in_date
+
+    def fetch_and_parse_city(self, city, check_in_date=None, check_out_date=None):
+        """Fetch and parse the results page for a city without touching the database"""
+        html_content, effective_check_in_date = self.fetch_city_page(city, check_in_date, check_out_date)
+        return self.parse_hotels(html_content, city, effective_check_in_date)
+
+    def scrape_source(self, check_in_date):
+        """Ingest_State source name for scrapes of a given check-in date"""
+        return f"booking:{check_in_date}"
+
+    def already_scraped(self, city, check_in_date):
+        """Whether this city and check-in date have already been scraped today"""
+        mark = get_high_water_mark(self.cursor, self.scrape_source(check_in_date), city)
+        return mark is not None and mark >= datetime.now().strftime('%Y-%m-%d')
+
+    def record_scrape(self, city, hotels_data):
+        """Save parsed hotels and advance the city's scrape high-water mark"""
+        with METRICS.span('db_write', city=city):
+            saved_count = self.save_to_db(hotels_data)
+        if saved_count:
+            hotel = hotels_data[0]
+            set_high_water_mark(self.cursor, self.conn, self.scrape_source(hotel['check_in_date']),
+                                city, hotel['scrape_date'])
         print(f"Finished scraping {city}. Saved {saved_count} hotels.")
+        return saved_count
 
+    def scrape_city(self, city, check_in_date=None, check_out_date=None):
+        """Scrape hotel data for a specific city"""
+        hotels_data = self.fetch_and_parse_city(city, check_in_date, check_out_date)
+        self.record_scrape(city, hotels_data)
         return hotels_data
 
-    def scrape_multiple_cities(self, cities, check_in_date=None, check_out_date=None):
-        """Scrape hotel data for multiple cities"""
-        all_hotels = []
-        for city in cities:
-            city_hotels = self.scrape_city(city, check_in_date, check_out_date)
-            all_hotels.extend(city_hotels)
+    def scrape_multiple_cities(self, cities, check_in_date=None, check_out_date=None, max_workers=1,
+                               incremental=False, parse_workers=0):
+        """Scrape hotel data for multiple cities
+
+        With max_workers > 1 the fetch and parse work for several cities overlaps
+        in a thread pool. Requests are paced by the shared rate limiter (a default
+        one is created if none was given) and all database writes stay on the
+        calling thread, since the sqlite connection is not shared across threads.
+
+        With parse_workers > 0, fetched pages are handed to a process pool for
+        parsing while the threads move on to the next fetches.
+
+        With incremental=True, cities already scraped today for this check-in
+        date are skipped.
+
+        Returns every scraped hotel in a HotelObservations store.
+        """
+        if incremental:
+            effective_check_in_date = check_in_date or (datetime.now() + timedelta(days=1)).strftime('%Y-%m-%d')
+            skipped = [city for city in cities if self.already_scraped(city, effective_check_in_date)]
+            for city in skipped:
+                METRICS.incr('cities_skipped', source='booking')
+                print(f"Skipping {city}: already scraped today for {effective_check_in_date}")
+            cities = [city for city in cities if city not in skipped]
+
+        all_hotels = HotelObservations()
+        if max_workers <= 1 and parse_workers <= 0:
+            for city in cities:
+                city_hotels = self.scrape_city(city, check_in_date, check_out_date)
+                all_hotels.extend(city_hotels)
+            return all_hotels
+
+        if not self.rate_limiter:
+            self.rate_limiter = TokenBucketRateLimiter()
+
+        parser_pool = ProcessPoolExecutor(max_workers=parse_workers) if parse_workers > 0 else None
+        fetch_task = self.fetch_city_page if parser_pool else self.fetch_and_parse_city
+        try:
+            with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+                fetches = {
+                    executor.submit(fetch_task, city, check_in_date, check_out_date): city
+                    for city in cities
+                }
+                parses = {}
+                pending = set(fetches)
+                while pending:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        city = fetches.get(future) or parses.get(future)
+                        try:
+                            result = future.result()
+                        except Exception as e:
+                            print(f"Error scraping {city}: {e}")
+                            continue
+                        if future in fetches and parser_pool:
+                            html_content, effective_check_in_date = result
+                            parse_future = parser_pool.submit(
+                                parse_hotels_html, html_content, city, effective_check_in_date,
+                                self.parser_backend, self.cards_only
+                            )
+                            parses[parse_future] = city
+                            pending.add(parse_future)
+                            continue
+                        self.record_scrape(city, result)
+                        all_hotels.extend(result)
+        finally:
+            if parser_pool:
+                parser_pool.shutdown()
         return all_hotels
 
-    def get_hotels_data_from_db(self, location=None, check_in_date=None, limit=10):
-        """Query hotel data from database with optional filters"""
-        query = "SELECT * FROM hotels"
-        params = []
-
-        conditions = []
-        if location:
-            conditions.append("location = ?")
-            params.append(location)
-        if check_in_date:
-            conditions.append("check_in_date = ?")
-            params.append(check_in_date)
+    @property
+    def query(self):
+        """Read-only HotelQuery over this database, created on first use"""
+        if self._query is None:
+            self._query = HotelQuery(self.db_path)
+        return self._query
 
-        if conditions:
-            query += " WHERE " + " AND ".join(conditions)
+    def get_hotels_data_from_db(self, location=None, check_in_date=None, limit=10):
+        """Query hotel data from database with optional filters
 
-        query += f" LIMIT {limit}"
+        Served by the read-only HotelQuery pool; use self.query.iter_hotels or
+        fetch_page directly for paging, projection and price/rating ranges.
+        """
+        import pandas as pd
 
-        print(f"\nQuerying DB: {query} with params {params}")
-        self.cursor.execute(query, params)
-        rows = self.cursor.fetchall()
+        filters = {'location': location or None, 'check_in_date': check_in_date or None}
+        print(f"\nQuerying DB: hotels with filters {filters}, limit {limit}")
+        rows, _ = self.query.fetch_page(limit=limit, **filters)
+        return pd.DataFrame(rows, columns=list(HOTEL_COLUMNS))
 
-        columns = [description[0] for description in self.cursor.description]
-        df = pd.DataFrame(rows, columns=columns)
+    def get_price_history(self, hotel_name, location, check_in_date=None):
+        """Price runs of one hotel (first/last scrape date, price, rating, reviews) as a DataFrame"""
+        import pandas as pd
 
-        return df
+        rows = get_price_history(self.conn, hotel_name, location, check_in_date)
+        return pd.DataFrame(rows, columns=['check_in_date', 'first_scrape_date', 'last_scrape_date',
+                                           'price', 'rating', 'review_count'])
 
     def close(self):
         """Close database connection"""
+        if self._query:
+            self._query.close()
+            self._query = None
         if self.conn:
             self.conn.close()
             print("Database connection closed.")
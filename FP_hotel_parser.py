@@ -0,0 +1,126 @@
+import re
+from datetime import datetime
+
+"""
+HTML parsing for Booking.com search result pages.
+
+parse_hotels_html is a plain module-level function so BookingScraper can run it
+in a process pool. The parser backend is pluggable: 'html.parser' (stdlib,
+default), 'lxml' (BeautifulSoup on the lxml parser) or 'selectolax' (Lexbor,
+fastest). With cards_only=True the BeautifulSoup backends only build a tree for
+the property-card elements instead of the whole document.
+"""
+
+PARSER_BACKENDS = ('html.parser', 'lxml', 'selectolax')
+
+CARD_SELECTOR = 'div[data-testid="property-card"]'
+CARD_FALLBACK_SELECTOR = 'div.c624d7469d.a0e60936ad.a3214e5942.b0db0e8ada'
+NAME_SELECTORS = ('div[data-testid="title"]', 'div.f6431b446c.a15b38c233')
+PRICE_SELECTORS = ('[data-testid="price-and-discounted-price"]',)
+RATING_SELECTORS = ('div.a3b8729ab1.d86cee9b25', 'div[data-testid="review-score"]')
+REVIEW_COUNT_SELECTORS = ('div.abf093bdfe.f45d8e4c32.d935416c47', 'div[data-testid="review-score"] div:last-child')
+
+PRICE_RE = re.compile(r'[\d,.]+')
+RATING_RE = re.compile(r'(\d+(\.\d+)?)$')
+REVIEW_COUNT_RE = re.compile(r'\d{1,3}(?:,\d{3})*')
+
+
+def parse_price(price_text):
+    price_match = PRICE_RE.search(price_text or '')
+    return float(price_match.group(0).replace(',', '')) if price_match else 0.0
+
+
+def parse_rating(rating_text):
+    rating_match = RATING_RE.search(rating_text or '')
+    return float(rating_match.group(1)) if rating_match else 0.0
+
+
+def parse_review_count(review_text):
+    review_count_match = REVIEW_COUNT_RE.search((review_text or '').replace('.', ''))
+    return int(review_count_match.group(0).replace(',', '')) if review_count_match else 0
+
+
+def _bs4_cards(html_content, backend, cards_only):
+    from bs4 import BeautifulSoup, SoupStrainer
+
+    if cards_only:
+        strainer = SoupStrainer('div', attrs={'data-testid': 'property-card'})
+        cards = BeautifulSoup(html_content, backend, parse_only=strainer).select(CARD_SELECTOR)
+        if cards:
+            return cards
+
+    soup = BeautifulSoup(html_content, backend)
+    hotel_containers = soup.select(CARD_SELECTOR)
+    if not hotel_containers:
+        print("No hotel containers found with the specified selector.")
+        hotel_containers = soup.select(CARD_FALLBACK_SELECTOR)
+        if not hotel_containers:
+            print("No hotel containers found even with the fallback selector.")
+    return hotel_containers
+
+
+def _bs4_text(card, selectors, joined=False):
+    for selector in selectors:
+        elem = card.select_one(selector)
+        if elem is not None:
+            return elem.get_text(strip=True) if joined else elem.text.strip()
+    return None
+
+
+def _selectolax_cards(html_content):
+    from selectolax.parser import HTMLParser
+
+    tree = HTMLParser(html_content)
+    hotel_containers = tree.css(CARD_SELECTOR)
+    if not hotel_containers:
+        print("No hotel containers found with the specified selector.")
+        hotel_containers = tree.css(CARD_FALLBACK_SELECTOR)
+        if not hotel_containers:
+            print("No hotel containers found even with the fallback selector.")
+    return hotel_containers
+
+
+def _selectolax_text(card, selectors, joined=False):
+    for selector in selectors:
+        node = card.css_first(selector)
+        if node is not None:
+            return node.text(strip=True) if joined else node.text().strip()
+    return None
+
+
+def parse_hotels_html(html_content, city, check_in_date, backend='html.parser', cards_only=False):
+    """Parse hotel information from HTML content"""
+    if not html_content:
+        print("No HTML content to parse.")
+        return []
+    if backend not in PARSER_BACKENDS:
+        raise ValueError(f"Unknown parser backend '{backend}', expected one of {PARSER_BACKENDS}")
+
+    if backend == 'selectolax':
+        hotel_containers = _selectolax_cards(html_content)
+        card_text = _selectolax_text
+    else:
+        hotel_containers = _bs4_cards(html_content, backend, cards_only)
+        card_text = _bs4_text
+
+    scrape_date = datetime.now().strftime('%Y-%m-%d')
+    hotels_data = []
+    for i, hotel in enumerate(hotel_containers):
+        try:
+            hotel_name = card_text(hotel, NAME_SELECTORS)
+            if hotel_name is None:
+                hotel_name = "Unknown"
+            hotels_data.append({
+                'hotel_name': hotel_name,
+                'location': city,
+                'price': parse_price(card_text(hotel, PRICE_SELECTORS, joined=True)),
+                'rating': parse_rating(card_text(hotel, RATING_SELECTORS)),
+                'review_count': parse_review_count(card_text(hotel, REVIEW_COUNT_SELECTORS)),
+                'scrape_date': scrape_date,
+                'check_in_date': check_in_date
+            })
+        except Exception as e:
+            print(f"Error parsing hotel container {i+1}: {e}")
+            continue
+
+    return hotels_data
@@ -0,0 +1,157 @@
+import os
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+from urllib.parse import quote
+
+"""
+Read-side query API for the hotels view (see FP_price_history).
+
+Queries run on a small pool of read-only connections (SQLite URI mode=ro),
+separate from the scraper's write connection; with the database in WAL mode
+readers never wait on a scrape that is writing. Results are paged with
+keyset pagination: each page returns a cursor holding the sort value and id
+of its last row, and the next page starts strictly after it, so deep pages
+cost the same as the first one. Columns and sort keys come from a whitelist
+and all values are bound as parameters.
+"""
+
+HOTEL_COLUMNS = ('id', 'hotel_name', 'location', 'price', 'rating', 'review_count', 'scrape_date', 'check_in_date')
+SORT_COLUMNS = ('id', 'price', 'rating', 'review_count', 'scrape_date', 'check_in_date')
+DEFAULT_PAGE_SIZE = 100
+
+
+class ReadOnlyConnectionPool:
+    def __init__(self, db_path, size=4):
+        """Up to `size` read-only connections to db_path, opened on demand"""
+        if not os.path.exists(db_path):
+            raise FileNotFoundError(f"Hotel database not found: {db_path}")
+        self.uri = f"file:{quote(os.path.abspath(db_path))}?mode=ro"
+        self.size = size
+        self.idle = queue.LifoQueue()
+        self.opened = 0
+        self.lock = threading.Lock()
+        self.closed = False
+
+    def _open(self):
+        conn = sqlite3.connect(self.uri, uri=True, check_same_thread=False)
+        conn.execute("PRAGMA query_only = ON")
+        return conn
+
+    @contextmanager
+    def connection(self):
+        """Borrow a connection, blocking while all `size` are in use"""
+        conn = None
+        with self.lock:
+            if self.closed:
+                raise RuntimeError("Connection pool is closed")
+            if self.idle.empty() and self.opened < self.size:
+                self.opened += 1
+                conn = self._open()
+        if conn is None:
+            conn = self.idle.get()
+        try:
+            yield conn
+        finally:
+            if self.closed:
+                conn.close()
+            else:
+                self.idle.put(conn)
+
+    def close(self):
+        with self.lock:
+            self.closed = True
+            while not self.idle.empty():
+                self.idle.get_nowait().close()
+
+
+class HotelQuery:
+    def __init__(self, db_path='weather_hotel_data.db', pool_size=4):
+        """Paged, filtered reads of the hotels view"""
+        self.pool = ReadOnlyConnectionPool(db_path, size=pool_size)
+
+    @staticmethod
+    def build_query(columns=None, location=None, check_in_date=None, min_price=None, max_price=None,
+                    min_rating=None, max_rating=None, order_by='id', descending=False, after=None,
+                    limit=DEFAULT_PAGE_SIZE):
+        """
+        Returns (sql, params, selected_columns) for one page. The id and the
+        sort column are always selected so the page's cursor can be built.
+        Rows with a NULL sort column are excluded when sorting by a column
+        other than id.
+        """
+        columns = list(columns or HOTEL_COLUMNS)
+        unknown = [column for column in columns if column not in HOTEL_COLUMNS]
+        if unknown:
+            raise ValueError(f"Unknown columns {unknown}, expected some of {HOTEL_COLUMNS}")
+        if order_by not in SORT_COLUMNS:
+            raise ValueError(f"Cannot sort by '{order_by}', expected one of {SORT_COLUMNS}")
+
+        selected = list(dict.fromkeys(columns + ['id', order_by]))
+        conditions = []
+        params = []
+        for clause, value in (
+            ("location = ?", location),
+            ("check_in_date = ?", check_in_date),
+            ("price >= ?", min_price),
+            ("price <= ?", max_price),
+            ("rating >= ?", min_rating),
+            ("rating <= ?", max_rating),
+        ):
+            if value is not None:
+                conditions.append(clause)
+                params.append(value)
+
+        direction = 'DESC' if descending else 'ASC'
+        comparison = '<' if descending else '>'
+        if order_by == 'id':
+            order = f"id {direction}"
+            if after is not None:
+                conditions.append(f"id {comparison} ?")
+                params.append(after[-1])
+        else:
+            conditions.append(f"{order_by} IS NOT NULL")
+            order = f"{order_by} {direction}, id {direction}"
+            if after is not None:
+                conditions.append(f"({order_by}, id) {comparison} (?, ?)")
+                params.extend(after)
+
+        sql = f"SELECT {', '.join(selected)} FROM hotels"
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        sql += f" ORDER BY {order} LIMIT ?"
+        params.append(int(limit))
+        return sql, params, selected
+
+    def fetch_page(self, columns=None, order_by='id', after=None, limit=DEFAULT_PAGE_SIZE, **filters):
+        """
+        One page of hotels as (rows, next_cursor). rows are dicts with the
+        requested columns; pass next_cursor as `after` to get the next page.
+        next_cursor is None once the last page has been returned.
+        """
+        sql, params, selected = self.build_query(columns, order_by=order_by, after=after, limit=limit, **filters)
+        with self.pool.connection() as conn:
+            rows = conn.execute(sql, params).fetchall()
+
+        wanted = list(columns or HOTEL_COLUMNS)
+        positions = [selected.index(column) for column in wanted]
+        page = [dict(zip(wanted, (row[i] for i in positions))) for row in rows]
+        next_cursor = None
+        if len(rows) == limit:
+            last = rows[-1]
+            id_value = last[selected.index('id')]
+            next_cursor = (id_value,) if order_by == 'id' else (last[selected.index(order_by)], id_value)
+        return page, next_cursor
+
+    def iter_hotels(self, columns=None, order_by='id', page_size=DEFAULT_PAGE_SIZE, **filters):
+        """Yields every matching hotel dict, reading page_size rows at a time"""
+        after = None
+        while True:
+            page, after = self.fetch_page(columns, order_by=order_by, after=after, limit=page_size, **filters)
+            yield from page
+            if after is None:
+                break
+
+    def close(self):
+        self.pool.close()
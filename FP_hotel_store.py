@@ -0,0 +1,160 @@
+import math
+import sys
+from array import array
+
+"""
+Compact columnar store for scraped hotel observations.
+
+A list of hotel dicts repeats seven keys and the same city and date strings
+on every row. HotelObservations keeps one typed array per column instead:
+float64 prices and ratings, int64 review counts, and dictionary-coded
+location, scrape_date and check_in_date (each distinct string is stored once,
+rows hold a small integer code). Hotel names are interned.
+
+rows() feeds executemany with the values exactly as parsed; to_dataframe()
+narrows prices and ratings to float32 for analysis only. Iterating or indexing
+still yields hotel dicts, so callers written for parse_hotels output keep working.
+"""
+
+COLUMNS = ('hotel_name', 'location', 'price', 'rating', 'review_count', 'scrape_date', 'check_in_date')
+
+MISSING_COUNT = -1
+MISSING_CODE = -1
+
+
+class StringDictionary:
+    def __init__(self):
+        """Distinct strings and their codes, shared by every row of a column"""
+        self.values = []
+        self.codes = {}
+
+    def encode(self, value):
+        if value is None:
+            return MISSING_CODE
+        code = self.codes.get(value)
+        if code is None:
+            code = len(self.values)
+            self.codes[value] = code
+            self.values.append(value)
+        return code
+
+    def decode(self, code):
+        return None if code == MISSING_CODE else self.values[code]
+
+
+def _to_float(value):
+    return math.nan if value is None else float(value)
+
+
+def _from_float(value):
+    return None if math.isnan(value) else value
+
+
+class HotelObservations:
+    def __init__(self):
+        """Empty store; fill it with append, extend or from_dicts"""
+        self.hotel_names = []
+        self.prices = array('d')
+        self.ratings = array('d')
+        self.review_counts = array('q')
+        self.location_codes = array('i')
+        self.scrape_date_codes = array('i')
+        self.check_in_date_codes = array('i')
+        self.locations = StringDictionary()
+        self.scrape_dates = StringDictionary()
+        self.check_in_dates = StringDictionary()
+
+    @classmethod
+    def from_dicts(cls, hotels_data):
+        observations = cls()
+        observations.extend(hotels_data)
+        return observations
+
+    def append(self, hotel_name, location, price, rating, review_count, scrape_date, check_in_date):
+        self.hotel_names.append(sys.intern(hotel_name) if isinstance(hotel_name, str) else hotel_name)
+        self.prices.append(_to_float(price))
+        self.ratings.append(_to_float(rating))
+        self.review_counts.append(MISSING_COUNT if review_count is None else int(review_count))
+        self.location_codes.append(self.locations.encode(location))
+        self.scrape_date_codes.append(self.scrape_dates.encode(scrape_date))
+        self.check_in_date_codes.append(self.check_in_dates.encode(check_in_date))
+
+    def append_dict(self, hotel):
+        self.append(*(hotel[column] for column in COLUMNS))
+
+    def extend(self, hotels_data):
+        """Append hotel dicts, or every row of another HotelObservations"""
+        for row in (hotels_data.rows() if isinstance(hotels_data, HotelObservations) else
+                    (tuple(hotel[column] for column in COLUMNS) for hotel in hotels_data)):
+            self.append(*row)
+
+    def __len__(self):
+        return len(self.hotel_names)
+
+    def row(self, i):
+        """Row i as a tuple in COLUMNS order"""
+        count = self.review_counts[i]
+        return (
+            self.hotel_names[i],
+            self.locations.decode(self.location_codes[i]),
+            _from_float(self.prices[i]),
+            _from_float(self.ratings[i]),
+            None if count == MISSING_COUNT else count,
+            self.scrape_dates.decode(self.scrape_date_codes[i]),
+            self.check_in_dates.decode(self.check_in_date_codes[i])
+        )
+
+    def rows(self):
+        """Tuples in COLUMNS order, ready for executemany"""
+        for i in range(len(self)):
+            yield self.row(i)
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError('observation index out of range')
+        return dict(zip(COLUMNS, self.row(i)))
+
+    def __iter__(self):
+        for row in self.rows():
+            yield dict(zip(COLUMNS, row))
+
+    def day_keys(self):
+        """Distinct (location, check_in_date) pairs present in the store"""
+        pairs = set(zip(self.location_codes, self.check_in_date_codes))
+        return {(self.locations.decode(loc), self.check_in_dates.decode(day)) for loc, day in pairs}
+
+    def scrape_keys(self):
+        """Distinct (location, check_in_date, scrape_date) pages present in the store"""
+        triples = set(zip(self.location_codes, self.check_in_date_codes, self.scrape_date_codes))
+        return {(self.locations.decode(loc), self.check_in_dates.decode(day), self.scrape_dates.decode(scrape))
+                for loc, day, scrape in triples}
+
+    def to_dataframe(self):
+        """
+        DataFrame with the COLUMNS. Prices and ratings are read from the
+        arrays without building Python floats and narrowed to float32, which
+        is plenty for correlations and charts; the database write path keeps
+        the full float64 values. String columns become categoricals over the
+        dictionary codes. Do not append to the store while the frame is alive:
+        the arrays cannot grow while numpy views of them exist (BufferError).
+        """
+        import numpy as np
+        import pandas as pd
+
+        def categorical(codes, dictionary):
+            return pd.Categorical.from_codes(np.frombuffer(codes, dtype=np.int32),
+                                             categories=pd.Index(dictionary.values, dtype=object))
+
+        review_counts = pd.array(np.frombuffer(self.review_counts, dtype=np.int64), dtype='Int64')
+        review_counts[review_counts == MISSING_COUNT] = pd.NA
+        return pd.DataFrame({
+            'hotel_name': self.hotel_names,
+            'location': categorical(self.location_codes, self.locations),
+            'price': np.frombuffer(self.prices, dtype=np.float64).astype(np.float32),
+            'rating': np.frombuffer(self.ratings, dtype=np.float64).astype(np.float32),
+            'review_count': review_counts,
+            'scrape_date': categorical(self.scrape_date_codes, self.scrape_dates),
+            'check_in_date': categorical(self.check_in_date_codes, self.check_in_dates),
+        }, copy=False)
@@ -0,0 +1,145 @@
+import json
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from datetime import datetime, timedelta
+from FP_hotel_database import TokenBucketRateLimiter
+
+"""
+Pagination and multi-date sweep engine for BookingScraper.
+
+A sweep enumerates cities x (check-in, check-out) ranges x result pages. Each
+(city, dates) task starts at page 0 and requests the next page only while the
+previous one came back full and still produced unseen hotels. Hotels are
+deduplicated by name within a task, fetches are scheduled through a bounded
+window of in-flight requests, and progress is checkpointed to JSON after every
+page so an interrupted sweep resumes where it stopped.
+"""
+
+PAGE_SIZE = 25
+
+
+def nightly_date_ranges(start_date, num_nights, length_of_stay=1):
+    """
+    Returns (check_in, check_out) string pairs for num_nights consecutive check-in dates.
+    """
+    if isinstance(start_date, str):
+        start_date = datetime.strptime(start_date, '%Y-%m-%d')
+    ranges = []
+    for i in range(num_nights):
+        check_in = start_date + timedelta(days=i)
+        check_out = check_in + timedelta(days=length_of_stay)
+        ranges.append((check_in.strftime('%Y-%m-%d'), check_out.strftime('%Y-%m-%d')))
+    return ranges
+
+
+class HotelSweep:
+    def __init__(self, scraper, cities, date_ranges, max_pages=10, max_in_flight=4,
+                 checkpoint_path='sweep_checkpoint.json', page_size=PAGE_SIZE):
+        """Sweep cities x date_ranges x pages with the given BookingScraper"""
+        self.scraper = scraper
+        self.cities = list(cities)
+        self.date_ranges = list(date_ranges)
+        self.max_pages = max_pages
+        self.max_in_flight = max(1, max_in_flight)
+        self.checkpoint_path = checkpoint_path
+        self.page_size = page_size
+        self.state = {}
+
+    @staticmethod
+    def task_key(city, check_in_date, check_out_date):
+        return f"{city}|{check_in_date}|{check_out_date}"
+
+    def load_checkpoint(self):
+        """Load task progress from the checkpoint file, if there is one"""
+        try:
+            with open(self.checkpoint_path, 'r', encoding='utf-8') as f:
+                self.state = json.load(f)
+        except (OSError, ValueError):
+            self.state = {}
+        return self.state
+
+    def save_checkpoint(self):
+        """Atomically write task progress (temp file + rename)"""
+        if not self.checkpoint_path:
+            return
+        tmp_path = self.checkpoint_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.state, f)
+        os.replace(tmp_path, self.checkpoint_path)
+
+    def pending_tasks(self):
+        """(city, check_in, check_out, page) for every task that is not finished"""
+        tasks = deque()
+        for city in self.cities:
+            for check_in_date, check_out_date in self.date_ranges:
+                key = self.task_key(city, check_in_date, check_out_date)
+                progress = self.state.setdefault(key, {'next_page': 0, 'done': False, 'seen': []})
+                if not progress['done']:
+                    tasks.append((city, check_in_date, check_out_date, progress['next_page']))
+        return tasks
+
+    def fetch_page(self, city, check_in_date, check_out_date, page):
+        """Fetch and parse one results page; returns None if the fetch failed"""
+        url = self.scraper.generate_booking_url(city, check_in_date, check_out_date,
+                                                offset=page * self.page_size)
+        print(f"\n--- Sweeping {city} ({check_in_date} to {check_out_date}), page {page + 1} ---")
+        html_content = self.scraper.fetch_page(url)
+        if html_content is None:
+            return None
+        return self.scraper.parse_hotels(html_content, city, check_in_date)
+
+    def handle_page(self, task, hotels_data, tasks):
+        """Dedupe and save one page, update the checkpoint and queue the next page"""
+        city, check_in_date, check_out_date, page = task
+        progress = self.state[self.task_key(city, check_in_date, check_out_date)]
+        if hotels_data is None:
+            print(f"Fetch failed for {city} page {page + 1}; it will be retried on resume.")
+            return 0
+
+        seen = set(progress['seen'])
+        new_hotels = []
+        for hotel in hotels_data:
+            if hotel['hotel_name'] not in seen:
+                seen.add(hotel['hotel_name'])
+                new_hotels.append(hotel)
+
+        saved_count = self.scraper.record_scrape(city, new_hotels) if new_hotels else 0
+        progress['seen'] = sorted(seen)
+        progress['next_page'] = page + 1
+        has_more = len(hotels_data) >= self.page_size and bool(new_hotels) and page + 1 < self.max_pages
+        progress['done'] = not has_more
+        if has_more:
+            tasks.append((city, check_in_date, check_out_date, page + 1))
+        self.save_checkpoint()
+        return saved_count
+
+    def run(self, resume=True):
+        """Run (or resume) the sweep; returns the number of hotels saved"""
+        if resume:
+            self.load_checkpoint()
+        else:
+            self.state = {}
+        if not self.scraper.rate_limiter:
+            self.scraper.rate_limiter = TokenBucketRateLimiter()
+
+        tasks = self.pending_tasks()
+        total_saved = 0
+        in_flight = {}
+        with ThreadPoolExecutor(max_workers=self.max_in_flight) as executor:
+            while tasks or in_flight:
+                while tasks and len(in_flight) < self.max_in_flight:
+                    task = tasks.popleft()
+                    in_flight[executor.submit(self.fetch_page, *task)] = task
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    task = in_flight.pop(future)
+                    try:
+                        hotels_data = future.result()
+                    except Exception as e:
+                        print(f"Error sweeping {task[0]} page {task[3] + 1}: {e}")
+                        hotels_data = None
+                    total_saved += self.handle_page(task, hotels_data, tasks)
+
+        print(f"\n--- Sweep complete: saved {total_saved} hotels ---")
+        return total_saved
@@ -0,0 +1,87 @@
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+"""
+Shared HTTP client for the Booking.com scraper and the OpenWeatherMap fetcher.
+
+Sessions keep connections alive in a pool so repeated calls to the same host
+skip the TCP+TLS handshake, every request gets a default timeout, and 429/5xx
+responses are retried with exponential backoff.
+"""
+
+DEFAULT_TIMEOUT = (5, 30)
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+THROTTLE_STATUSES = (429, 503)
+
+_shared_session = None
+_session_lock = threading.Lock()
+
+
+class TimeoutHTTPAdapter(HTTPAdapter):
+    def __init__(self, *args, timeout=DEFAULT_TIMEOUT, **kwargs):
+        """HTTPAdapter that applies a default (connect, read) timeout"""
+        self.timeout = timeout
+        super().__init__(*args, **kwargs)
+
+    def send(self, request, **kwargs):
+        if kwargs.get('timeout') is None:
+            kwargs['timeout'] = self.timeout
+        return super().send(request, **kwargs)
+
+
+def create_session(pool_size=10, timeout=DEFAULT_TIMEOUT, max_retries=3, backoff_factor=1.0):
+    """
+    Creates a requests.Session with connection pooling, timeouts and retries.
+    """
+    retry = Retry(
+        total=max_retries,
+        backoff_factor=backoff_factor,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=frozenset(['GET', 'HEAD']),
+        respect_retry_after_header=True
+    )
+    adapter = TimeoutHTTPAdapter(
+        pool_connections=pool_size,
+        pool_maxsize=pool_size,
+        max_retries=retry,
+        timeout=timeout
+    )
+    session = requests.Session()
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+def is_rate_limited(error):
+    """
+    Whether a requests exception means the upstream is throttling us: retries
+    exhausted on 429/5xx responses, or a 429/503 response raised directly.
+    """
+    if isinstance(error, requests.exceptions.RetryError):
+        return True
+    response = getattr(error, 'response', None)
+    return response is not None and response.status_code in THROTTLE_STATUSES
+
+
+def get_session():
+    """
+    Returns the process-wide shared session, creating it on first use.
+    """
+    global _shared_session
+    with _session_lock:
+        if _shared_session is None:
+            _shared_session = create_session()
+        return _shared_session
+
+
+def close_session():
+    """
+    Closes the shared session and its pooled connections.
+    """
+    global _shared_session
+    with _session_lock:
+        if _shared_session is not None:
+            _shared_session.close()
+            _shared_session = None
@@ -0,0 +1,48 @@
+"""
+High-water marks for incremental ingestion.
+
+Each (source, city) pair remembers the newest value it has ingested so a
+run only has to load rows past that mark instead of rebuilding the tables.
+"""
+
+
+def create_ingest_state_table(cur, conn):
+    """
+    Creates the Ingest_State table that stores one high-water mark per source and city.
+    """
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS Ingest_State (
+            source TEXT,
+            city TEXT,
+            high_water_mark TEXT,
+            updated_at TEXT DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY(source, city)
+        )
+    """)
+    conn.commit()
+
+
+def get_high_water_mark(cur, source, city):
+    """
+    Returns the stored high-water mark for a source and city, or None.
+    """
+    cur.execute(
+        "SELECT high_water_mark FROM Ingest_State WHERE source = ? AND city = ?",
+        (source, city)
+    )
+    result = cur.fetchone()
+    return result[0] if result else None
+
+
+def set_high_water_mark(cur, conn, source, city, mark):
+    """
+    Moves the high-water mark forward. Older marks never overwrite newer ones.
+    """
+    cur.execute("""
+        INSERT INTO Ingest_State (source, city, high_water_mark, updated_at)
+        VALUES (?, ?, ?, CURRENT_TIMESTAMP)
+        ON CONFLICT(source, city) DO UPDATE SET
+            high_water_mark = MAX(high_water_mark, excluded.high_water_mark),
+            updated_at = CURRENT_TIMESTAMP
+    """, (source, city, mark))
+    conn.commit()
@@ -0,0 +1,122 @@
+import json
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+"""
+Lightweight run instrumentation for the Weather-or-Not pipeline.
+
+METRICS is a process-wide registry of timing spans and counters. Spans are
+recorded with `with METRICS.span('stage', city='Detroit'):` and counters with
+METRICS.incr('rows_inserted', n, table='hotels'). A run report can be written
+as JSON or in the Prometheus text exposition format.
+"""
+
+PROMETHEUS_PREFIX = 'fp'
+
+
+def _label_key(labels):
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def _format_labels(label_key, extra=()):
+    pairs = list(label_key) + list(extra)
+    if not pairs:
+        return ''
+    escaped = [(key, value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')) for key, value in pairs]
+    return '{' + ','.join(f'{key}="{value}"' for key, value in escaped) + '}'
+
+
+class Metrics:
+    def __init__(self):
+        """Thread-safe registry of spans and counters"""
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.started_at = datetime.now().isoformat(timespec='seconds')
+            self.counters = {}
+            self.spans = {}
+
+    def incr(self, name, value=1, **labels):
+        """Add value to a counter"""
+        key = (name, _label_key(labels))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, seconds, **labels):
+        """Record a duration measured elsewhere under a span name"""
+        key = (name, _label_key(labels))
+        with self.lock:
+            stats = self.spans.setdefault(key, {'count': 0, 'seconds': 0.0, 'max_seconds': 0.0})
+            stats['count'] += 1
+            stats['seconds'] += seconds
+            stats['max_seconds'] = max(stats['max_seconds'], seconds)
+
+    def total(self, name):
+        """Sum of a counter across all label values"""
+        with self.lock:
+            return sum(value for (counter, _), value in self.counters.items() if counter == name)
+
+    @contextmanager
+    def span(self, name, **labels):
+        """Time the enclosed block"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def report(self):
+        """Snapshot of all spans and counters as plain dicts"""
+        with self.lock:
+            return {
+                'started_at': self.started_at,
+                'generated_at': datetime.now().isoformat(timespec='seconds'),
+                'spans': [
+                    dict(name=name, labels=dict(labels), **stats)
+                    for (name, labels), stats in sorted(self.spans.items())
+                ],
+                'counters': [
+                    {'name': name, 'labels': dict(labels), 'value': value}
+                    for (name, labels), value in sorted(self.counters.items())
+                ]
+            }
+
+    def write_json(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.report(), f, indent=4)
+
+    def to_prometheus(self):
+        """Render spans as summaries and counters as *_total in Prometheus text format"""
+        lines = []
+        with self.lock:
+            spans = sorted(self.spans.items())
+            counters = sorted(self.counters.items())
+
+        span_names = sorted({name for (name, _), _ in spans})
+        if span_names:
+            metric = f'{PROMETHEUS_PREFIX}_span_seconds'
+            lines.append(f'# HELP {metric} Time spent in each pipeline span.')
+            lines.append(f'# TYPE {metric} summary')
+            for (name, labels), stats in spans:
+                label_text = _format_labels(labels, [('span', name)])
+                lines.append(f'{metric}_sum{label_text} {stats["seconds"]:.6f}')
+                lines.append(f'{metric}_count{label_text} {stats["count"]}')
+
+        for counter_name in sorted({name for (name, _), _ in counters}):
+            metric = f'{PROMETHEUS_PREFIX}_{counter_name}_total'
+            lines.append(f'# TYPE {metric} counter')
+            for (name, labels), value in counters:
+                if name == counter_name:
+                    lines.append(f'{metric}{_format_labels(labels)} {value}')
+        return '\n'.join(lines) + '\n'
+
+    def write_prometheus(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(self.to_prometheus())
+
+
+METRICS = Metrics()
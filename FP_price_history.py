@@ -0,0 +1,350 @@
+import re
+from collections import Counter
+
+"""
+Normalized hotel identity and run-length encoded price history.
+
+`hotel` gives every property a stable integer id keyed by its normalized
+name and city. `price_observation` stores what was seen for a hotel and
+check-in date as runs: consecutive scrapes that found the same price, rating
+and review count only stretch the latest run's last_scrape_date instead of
+adding a row. A hotel's price history is then an index range scan on
+(hotel_id, check_in_date) rather than a string match over a raw scrape log.
+
+These tables are the only copy of scraped hotels. `price_scrape` remembers
+which (location, check_in_date) pages were scraped on which day, which the
+runs alone do not. `hotels` is a view over them with the columns of the old
+per-scrape table, one row per price run (scrape_date is the run's last
+scrape), plus `scrapes`: how many scrapes of the run's page fall inside the
+run. Readers weight each row by it, so averages and counts come out as they
+did over one row per scrape.
+
+record_observations works a scrape day at a time: one query fetches the
+latest run of every (hotel, check-in date) in the batch, and the rows that
+extend it or start a new run after it are written with executemany. Only
+rows that land inside or before an existing run, or hotels listed more than
+once in one scrape, go through the row-by-row path.
+"""
+
+HOTEL_DIMENSION_DDL = '''
+    CREATE TABLE IF NOT EXISTS hotel (
+        id INTEGER PRIMARY KEY,
+        hotel_key TEXT NOT NULL UNIQUE,
+        hotel_name TEXT,
+        location TEXT
+    )
+'''
+
+PRICE_OBSERVATION_DDL = '''
+    CREATE TABLE IF NOT EXISTS price_observation (
+        id INTEGER PRIMARY KEY,
+        hotel_id INTEGER NOT NULL REFERENCES hotel(id),
+        check_in_date TEXT,
+        first_scrape_date TEXT,
+        last_scrape_date TEXT,
+        price REAL,
+        rating REAL,
+        review_count INTEGER
+    )
+'''
+
+PRICE_OBSERVATION_INDEX = '''
+    CREATE INDEX IF NOT EXISTS idx_price_observation_hotel_check_in
+    ON price_observation (hotel_id, check_in_date, last_scrape_date)
+'''
+
+PRICE_SCRAPE_DDL = '''
+    CREATE TABLE IF NOT EXISTS price_scrape (
+        location TEXT NOT NULL,
+        check_in_date TEXT NOT NULL,
+        scrape_date TEXT NOT NULL,
+        PRIMARY KEY (location, check_in_date, scrape_date)
+    )
+'''
+
+HOTELS_VIEW_DDL = '''
+    CREATE VIEW IF NOT EXISTS hotels AS
+    SELECT po.id AS id, h.hotel_name AS hotel_name, h.location AS location, po.price AS price,
+           po.rating AS rating, po.review_count AS review_count,
+           po.last_scrape_date AS scrape_date, po.check_in_date AS check_in_date,
+           MAX(1, (SELECT COUNT(*) FROM price_scrape ps
+                   WHERE ps.location = h.location AND ps.check_in_date = po.check_in_date
+                     AND ps.scrape_date BETWEEN po.first_scrape_date AND po.last_scrape_date)) AS scrapes
+    FROM price_observation po
+    JOIN hotel h ON h.id = po.hotel_id
+'''
+
+# Filters, joins and keyset pages on the hotels view resolve to these
+HOTELS_VIEW_INDEXES = (
+    "CREATE INDEX IF NOT EXISTS idx_hotel_location ON hotel (location)",
+    "CREATE INDEX IF NOT EXISTS idx_price_observation_check_in ON price_observation (check_in_date)",
+    "CREATE INDEX IF NOT EXISTS idx_price_observation_price ON price_observation (price)",
+    "CREATE INDEX IF NOT EXISTS idx_price_observation_rating ON price_observation (rating)",
+)
+
+OBSERVATION_BATCH_DDL = '''
+    CREATE TEMP TABLE IF NOT EXISTS observation_batch (
+        hotel_key TEXT,
+        hotel_name TEXT,
+        location TEXT,
+        check_in_date TEXT
+    )
+'''
+
+# Hotel id and latest run (if any) of every batch row, in batch order
+LATEST_RUNS_SQL = '''
+    SELECT h.id, po.id, po.first_scrape_date, po.last_scrape_date, po.price, po.rating, po.review_count
+    FROM temp.observation_batch b
+    JOIN hotel h ON h.hotel_key = b.hotel_key
+    LEFT JOIN price_observation po ON po.id = (
+        SELECT id FROM price_observation
+        WHERE hotel_id = h.id AND check_in_date IS b.check_in_date
+        ORDER BY last_scrape_date DESC, id DESC
+        LIMIT 1
+    )
+    ORDER BY b.rowid
+'''
+
+RUN_COLUMNS = "id, first_scrape_date, last_scrape_date, price, rating, review_count"
+
+INSERT_RUN_SQL = '''
+    INSERT INTO price_observation (hotel_id, check_in_date, first_scrape_date, last_scrape_date,
+                                   price, rating, review_count)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+'''
+
+NON_WORD_RE = re.compile(r'[\W_]+')
+
+
+def normalize_hotel_key(hotel_name, location):
+    """Case-, punctuation- and whitespace-insensitive 'name|city' key"""
+    name = NON_WORD_RE.sub(' ', (hotel_name or '').casefold()).strip()
+    city = NON_WORD_RE.sub(' ', (location or '').casefold()).strip()
+    return f"{name}|{city}"
+
+
+def record_observations(conn, rows):
+    """
+    Adds (hotel_name, location, price, rating, review_count, scrape_date,
+    check_in_date) rows to the price history. A row equal to the run just
+    before or just after its scrape_date (for its hotel and check-in date)
+    extends that run, joining the two when both match; a row that differs
+    from the run covering its day cuts that run around the day first;
+    anything else starts a new run. Rows need not arrive in scrape order.
+    Runs in the caller's transaction. Returns (new_runs, extended).
+    """
+    by_day = {}
+    for row in dict.fromkeys(tuple(row) for row in rows):
+        by_day.setdefault(row[5], []).append(row)
+    new_runs = extended = 0
+    for scrape_date in sorted(by_day, key=lambda day: (day is None, day or '')):
+        started, stretched = _record_batch(conn, by_day[scrape_date])
+        new_runs += started
+        extended += stretched
+    return new_runs, extended
+
+
+def _record_batch(conn, rows):
+    """One scrape day's rows: in bulk for the common cases, row by row for the rest"""
+    hotel_keys = {hotel: normalize_hotel_key(*hotel) for hotel in {row[:2] for row in rows}}
+    conn.execute(OBSERVATION_BATCH_DDL)
+    conn.execute("DELETE FROM temp.observation_batch")
+    conn.executemany(
+        "INSERT INTO temp.observation_batch (hotel_key, hotel_name, location, check_in_date) VALUES (?, ?, ?, ?)",
+        ((hotel_keys[row[:2]], row[0], row[1], row[6]) for row in rows)
+    )
+    conn.execute('''
+        INSERT OR IGNORE INTO hotel (hotel_key, hotel_name, location)
+        SELECT hotel_key, hotel_name, location FROM temp.observation_batch
+        WHERE rowid IN (SELECT MIN(rowid) FROM temp.observation_batch GROUP BY hotel_key)
+    ''')
+    conn.executemany(
+        "INSERT OR IGNORE INTO price_scrape (location, check_in_date, scrape_date) VALUES (?, ?, ?)",
+        {(row[1], row[6], row[5]) for row in rows if None not in (row[1], row[6], row[5])}
+    )
+    latest = conn.execute(LATEST_RUNS_SQL).fetchall()
+    conn.execute("DELETE FROM temp.observation_batch")
+
+    listed = Counter((run[0], row[6]) for row, run in zip(rows, latest))
+    new, extend, slow = [], [], []
+    for row, (hotel_id, run_id, first, last, *run_values) in zip(rows, latest):
+        scrape_date, check_in_date = row[5], row[6]
+        values = row[2:5]
+        if scrape_date is None or listed[hotel_id, check_in_date] > 1:
+            slow.append((hotel_id, row))
+        elif run_id is None:
+            new.append((hotel_id, check_in_date, scrape_date, scrape_date) + values)
+        elif scrape_date > (last or ''):
+            if tuple(run_values) == values:
+                extend.append((scrape_date, run_id))
+            else:
+                new.append((hotel_id, check_in_date, scrape_date, scrape_date) + values)
+        elif not (scrape_date >= (first or '') and tuple(run_values) == values):
+            slow.append((hotel_id, row))
+
+    conn.executemany("UPDATE price_observation SET last_scrape_date = ? WHERE id = ?", extend)
+    conn.executemany(INSERT_RUN_SQL, new)
+    new_runs, extended = len(new), len(extend)
+    recorded = set()
+    for hotel_id, (_, location, price, rating, review_count, scrape_date, check_in_date) in slow:
+        started, stretched = _record_row(
+            conn, hotel_id, location, price, rating, review_count, scrape_date, check_in_date,
+            listed_again=(hotel_id, check_in_date) in recorded
+        )
+        recorded.add((hotel_id, check_in_date))
+        new_runs += started
+        extended += stretched
+    return new_runs, extended
+
+
+def _run_at_or_before(conn, hotel_id, check_in_date, day):
+    return conn.execute(f'''
+        SELECT {RUN_COLUMNS} FROM price_observation
+        WHERE hotel_id = ? AND check_in_date IS ? AND COALESCE(first_scrape_date, '') <= ?
+        ORDER BY first_scrape_date DESC, id DESC
+        LIMIT 1
+    ''', (hotel_id, check_in_date, day)).fetchone()
+
+
+def _run_after(conn, hotel_id, check_in_date, day):
+    return conn.execute(f'''
+        SELECT {RUN_COLUMNS} FROM price_observation
+        WHERE hotel_id = ? AND check_in_date IS ? AND COALESCE(first_scrape_date, '') > ?
+        ORDER BY first_scrape_date, id
+        LIMIT 1
+    ''', (hotel_id, check_in_date, day)).fetchone()
+
+
+def _neighbour_scrapes(conn, location, check_in_date, scrape_date):
+    """The page's scrape days just before and just after scrape_date (None when there is none)"""
+    page = (location, check_in_date, scrape_date)
+    before = conn.execute(
+        "SELECT MAX(scrape_date) FROM price_scrape WHERE location = ? AND check_in_date = ? AND scrape_date < ?",
+        page
+    ).fetchone()[0]
+    after = conn.execute(
+        "SELECT MIN(scrape_date) FROM price_scrape WHERE location = ? AND check_in_date = ? AND scrape_date > ?",
+        page
+    ).fetchone()[0]
+    return before, after
+
+
+def _cut_run(conn, run_id, first_scrape_date, last_scrape_date, before, after):
+    """
+    Removes one scrape day from a run: the part before it ends at the page's
+    previous scrape `before`, the part after starts at its next scrape
+    `after`, and a run of that single day is deleted.
+    """
+    keep_head = before is not None and first_scrape_date <= before
+    keep_tail = after is not None and after <= last_scrape_date
+    if keep_head and keep_tail:
+        conn.execute('''
+            INSERT INTO price_observation (hotel_id, check_in_date, first_scrape_date, last_scrape_date,
+                                           price, rating, review_count)
+            SELECT hotel_id, check_in_date, ?, last_scrape_date, price, rating, review_count
+            FROM price_observation WHERE id = ?
+        ''', (after, run_id))
+        conn.execute("UPDATE price_observation SET last_scrape_date = ? WHERE id = ?", (before, run_id))
+    elif keep_head:
+        conn.execute("UPDATE price_observation SET last_scrape_date = ? WHERE id = ?", (before, run_id))
+    elif keep_tail:
+        conn.execute("UPDATE price_observation SET first_scrape_date = ? WHERE id = ?", (after, run_id))
+    else:
+        conn.execute("DELETE FROM price_observation WHERE id = ?", (run_id,))
+
+
+def _record_row(conn, hotel_id, location, price, rating, review_count, scrape_date, check_in_date,
+                listed_again=False):
+    """
+    Row-by-row path of record_observations; returns (new_runs, extended).
+    listed_again marks a hotel already recorded from the same scrape.
+    """
+    values = (price, rating, review_count)
+    day = scrape_date or ''
+    previous = _run_at_or_before(conn, hotel_id, check_in_date, day)
+    if previous and day <= (previous[2] or ''):
+        if previous[3:] == values:
+            return 0, 0
+        if listed_again or scrape_date is None or location is None or check_in_date is None:
+            # A second listing on the same page, or no page to place the day in; keep both
+            conn.execute(INSERT_RUN_SQL, (hotel_id, check_in_date, scrape_date, scrape_date) + values)
+            return 1, 0
+        _cut_run(conn, *previous[:3], *_neighbour_scrapes(conn, location, check_in_date, scrape_date))
+        previous = _run_at_or_before(conn, hotel_id, check_in_date, day)
+
+    following = _run_after(conn, hotel_id, check_in_date, day)
+    joins_previous = previous is not None and previous[3:] == values
+    joins_following = following is not None and following[3:] == values
+    if joins_previous and joins_following:
+        conn.execute("UPDATE price_observation SET last_scrape_date = ? WHERE id = ?",
+                     (following[2], previous[0]))
+        conn.execute("DELETE FROM price_observation WHERE id = ?", (following[0],))
+    elif joins_previous:
+        conn.execute("UPDATE price_observation SET last_scrape_date = ? WHERE id = ?", (scrape_date, previous[0]))
+    elif joins_following:
+        conn.execute("UPDATE price_observation SET first_scrape_date = ? WHERE id = ?", (scrape_date, following[0]))
+    else:
+        conn.execute(INSERT_RUN_SQL, (hotel_id, check_in_date, scrape_date, scrape_date) + values)
+        return 1, 0
+    return 0, 1
+
+
+def forget_scrapes(conn, keys):
+    """
+    Removes what was recorded for the (location, check_in_date, scrape_date)
+    pages in keys, so they can be recorded again without doubling up. Runs
+    that cover one of those days are cut around it (see _cut_run). Runs in
+    the caller's transaction.
+    """
+    for location, check_in_date, scrape_date in sorted(set(keys)):
+        before, after = _neighbour_scrapes(conn, location, check_in_date, scrape_date)
+        runs = conn.execute('''
+            SELECT po.id, po.first_scrape_date, po.last_scrape_date
+            FROM price_observation po
+            JOIN hotel h ON h.id = po.hotel_id
+            WHERE h.location = ? AND po.check_in_date = ?
+              AND po.first_scrape_date <= ? AND po.last_scrape_date >= ?
+        ''', (location, check_in_date, scrape_date, scrape_date)).fetchall()
+        for run in runs:
+            _cut_run(conn, *run, before, after)
+        conn.execute(
+            "DELETE FROM price_scrape WHERE location = ? AND check_in_date = ? AND scrape_date = ?",
+            (location, check_in_date, scrape_date)
+        )
+
+
+def backfill_price_history(conn, chunk_size=10000):
+    """
+    Feeds the whole per-scrape `hotels` table, oldest scrape first, into the
+    price history. Only meaningful before that table is replaced by the view.
+    """
+    cursor = conn.execute('''
+        SELECT hotel_name, location, price, rating, review_count, scrape_date, check_in_date
+        FROM hotels
+        ORDER BY scrape_date, id
+    ''')
+    while True:
+        rows = cursor.fetchmany(chunk_size)
+        if not rows:
+            break
+        record_observations(conn, rows)
+
+
+def get_price_history(conn, hotel_name, location, check_in_date=None):
+    """
+    Price runs of one hotel as (check_in_date, first_scrape_date,
+    last_scrape_date, price, rating, review_count), oldest first.
+    """
+    query = '''
+        SELECT po.check_in_date, po.first_scrape_date, po.last_scrape_date,
+               po.price, po.rating, po.review_count
+        FROM hotel h
+        JOIN price_observation po ON po.hotel_id = h.id
+        WHERE h.hotel_key = ?
+    '''
+    params = [normalize_hotel_key(hotel_name, location)]
+    if check_in_date:
+        query += " AND po.check_in_date = ?"
+        params.append(check_in_date)
+    query += " ORDER BY po.check_in_date, po.first_scrape_date, po.id"
+    return conn.execute(query, params).fetchall()
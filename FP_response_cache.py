@@ -0,0 +1,183 @@
+import gzip
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from urllib.parse import urlparse, parse_qs
+
+"""
+Content-addressed on-disk cache of raw Booking.com responses.
+
+Pages are stored compressed under the SHA-256 of their URL, with a small SQLite
+index tracking fetch time, last access and size. Entries expire after a TTL and
+the least recently used ones are evicted once the cache grows past max_bytes.
+replay_cached_pages re-runs parse_hotels and save_to_db over cached pages, so a
+parser fix can be applied to past scrapes without touching the network.
+"""
+
+COMPRESSIONS = ('gzip', 'zstd')
+
+
+def _compress(data, compression):
+    if compression == 'zstd':
+        import zstandard
+        return zstandard.ZstdCompressor().compress(data)
+    return gzip.compress(data)
+
+
+def _decompress(data, compression):
+    if compression == 'zstd':
+        import zstandard
+        return zstandard.ZstdDecompressor().decompress(data)
+    return gzip.decompress(data)
+
+
+class ResponseCache:
+    def __init__(self, directory='html_cache', ttl_seconds=7 * 24 * 3600, max_bytes=500 * 1024 * 1024,
+                 compression='gzip'):
+        """Open (or create) a response cache in `directory`"""
+        if compression not in COMPRESSIONS:
+            raise ValueError(f"Unknown compression '{compression}', expected one of {COMPRESSIONS}")
+        self.directory = directory
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.compression = compression
+        self.lock = threading.Lock()
+
+        os.makedirs(directory, exist_ok=True)
+        self.conn = sqlite3.connect(os.path.join(directory, 'index.db'), check_same_thread=False)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                url TEXT,
+                fetched_at REAL,
+                last_access REAL,
+                size INTEGER,
+                compression TEXT
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_last_access ON responses (last_access)")
+        self.conn.commit()
+
+    @staticmethod
+    def cache_key(url):
+        return hashlib.sha256(url.encode('utf-8')).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], key)
+
+    def get(self, url, allow_stale=False):
+        """Return the cached page for a URL, or None if missing or expired"""
+        key = self.cache_key(url)
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT fetched_at, compression FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if not row:
+                return None
+            fetched_at, compression = row
+            if not allow_stale and time.time() - fetched_at > self.ttl_seconds:
+                return None
+            try:
+                with open(self._path(key), 'rb') as f:
+                    html = _decompress(f.read(), compression).decode('utf-8')
+            except OSError:
+                self.conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self.conn.commit()
+                return None
+            self.conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (time.time(), key))
+            self.conn.commit()
+            return html
+
+    def put(self, url, html):
+        """Store a page, replacing any earlier copy, then enforce max_bytes"""
+        key = self.cache_key(url)
+        data = _compress(html.encode('utf-8'), self.compression)
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+        now = time.time()
+        with self.lock:
+            self.conn.execute("""
+                INSERT OR REPLACE INTO responses (key, url, fetched_at, last_access, size, compression)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, (key, url, now, now, len(data), self.compression))
+            self.conn.commit()
+            self._evict()
+
+    def _evict(self):
+        """Delete least recently used entries until the cache fits in max_bytes"""
+        total = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in self.conn.execute(
+            "SELECT key, size FROM responses ORDER BY last_access"
+        ).fetchall():
+            if total <= self.max_bytes:
+                break
+            self._remove(key)
+            total -= size
+        self.conn.commit()
+
+    def _remove(self, key):
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+        self.conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+
+    def purge_expired(self):
+        """Delete every entry older than the TTL; returns how many were removed"""
+        cutoff = time.time() - self.ttl_seconds
+        with self.lock:
+            keys = [row[0] for row in self.conn.execute(
+                "SELECT key FROM responses WHERE fetched_at < ?", (cutoff,)
+            ).fetchall()]
+            for key in keys:
+                self._remove(key)
+            self.conn.commit()
+        return len(keys)
+
+    def entries(self):
+        """(url, fetched_at) for every cached page, oldest first"""
+        with self.lock:
+            return self.conn.execute("SELECT url, fetched_at FROM responses ORDER BY fetched_at").fetchall()
+
+    def close(self):
+        with self.lock:
+            if self.conn:
+                self.conn.close()
+                self.conn = None
+
+
+def replay_cached_pages(scraper, cache):
+    """
+    Re-parses every cached page with scraper.parse_hotels and saves the results.
+    City and check-in date come from the cached URL, and scrape_date from the
+    time the page was fetched. Each page replaces what was saved for its city,
+    check-in date and scrape date, so replaying twice does not add rows.
+    Returns the number of hotels saved.
+    """
+    total = 0
+    for url, fetched_at in cache.entries():
+        query = parse_qs(urlparse(url).query)
+        city = query.get('ss', [None])[0]
+        check_in_date = query.get('checkin', [None])[0]
+        html_content = cache.get(url, allow_stale=True)
+        if not city or not html_content:
+            continue
+
+        hotels_data = scraper.parse_hotels(html_content, city, check_in_date)
+        scrape_date = datetime.fromtimestamp(fetched_at).strftime('%Y-%m-%d')
+        for hotel in hotels_data:
+            hotel['scrape_date'] = scrape_date
+        saved_count = scraper.save_to_db(hotels_data, replace=True)
+        print(f"Replayed {city} ({check_in_date}): saved {saved_count} hotels.")
+        total += saved_count
+    return total
@@ -0,0 +1,85 @@
+"""
+Materialized per-day rollups of hotel prices and weather readings.
+
+Hotel_Daily_Rollup (hotel database) keeps row counts, price sums and sums of
+squares per (location, check_in_date) over the hotels view, each price run
+weighted by its number of scrapes; Weather_Daily_Rollup (weather
+database) keeps the same for temperature per (city, date, weather_type_id).
+The tables are created and backfilled by FP_schema migrations and refreshed
+for the affected keys whenever save_to_db or insert_weather_data writes rows,
+so reports read a few small tables instead of scanning and joining raw rows.
+Refreshes run inside the caller's transaction; the caller commits.
+"""
+
+HOTEL_ROLLUP_DDL = '''
+    CREATE TABLE IF NOT EXISTS Hotel_Daily_Rollup (
+        location TEXT NOT NULL,
+        check_in_date TEXT NOT NULL,
+        n INTEGER NOT NULL,
+        n_price INTEGER NOT NULL,
+        sum_price REAL NOT NULL,
+        sum_price_sq REAL NOT NULL,
+        PRIMARY KEY (location, check_in_date)
+    )
+'''
+
+WEATHER_ROLLUP_DDL = '''
+    CREATE TABLE IF NOT EXISTS Weather_Daily_Rollup (
+        city TEXT NOT NULL,
+        date TEXT NOT NULL,
+        weather_type_id INTEGER NOT NULL,
+        n INTEGER NOT NULL,
+        n_temp INTEGER NOT NULL,
+        sum_temp REAL NOT NULL,
+        sum_temp_sq REAL NOT NULL,
+        PRIMARY KEY (city, date, weather_type_id)
+    )
+'''
+
+HOTEL_ROLLUP_INSERT = '''
+    INSERT INTO Hotel_Daily_Rollup (location, check_in_date, n, n_price, sum_price, sum_price_sq)
+    SELECT location, check_in_date, SUM(scrapes), COALESCE(SUM(CASE WHEN price IS NOT NULL THEN scrapes END), 0),
+           COALESCE(SUM(price * scrapes), 0.0), COALESCE(SUM(price * price * scrapes), 0.0)
+    FROM hotels
+    WHERE location IS NOT NULL AND check_in_date IS NOT NULL {where}
+    GROUP BY location, check_in_date
+'''
+
+WEATHER_ROLLUP_INSERT = '''
+    INSERT INTO Weather_Daily_Rollup (city, date, weather_type_id, n, n_temp, sum_temp, sum_temp_sq)
+    SELECT city, date, weather_type_id, COUNT(*), COUNT(temp),
+           COALESCE(SUM(temp), 0.0), COALESCE(SUM(temp * temp), 0.0)
+    FROM Weather_Data
+    WHERE city IS NOT NULL AND date IS NOT NULL AND weather_type_id IS NOT NULL {where}
+    GROUP BY city, date, weather_type_id
+'''
+
+
+def refresh_hotel_rollup(conn, keys=None):
+    """
+    Recomputes Hotel_Daily_Rollup for the given (location, check_in_date)
+    keys from the hotels view, or rebuilds it entirely when keys is None.
+    """
+    if keys is None:
+        conn.execute("DELETE FROM Hotel_Daily_Rollup")
+        conn.execute(HOTEL_ROLLUP_INSERT.format(where=''))
+        return
+    insert = HOTEL_ROLLUP_INSERT.format(where='AND location = ? AND check_in_date = ?')
+    for key in sorted(set(keys)):
+        conn.execute("DELETE FROM Hotel_Daily_Rollup WHERE location = ? AND check_in_date = ?", key)
+        conn.execute(insert, key)
+
+
+def refresh_weather_rollup(conn, keys=None):
+    """
+    Recomputes Weather_Daily_Rollup for the given (city, date) keys from
+    Weather_Data, or rebuilds it entirely when keys is None.
+    """
+    if keys is None:
+        conn.execute("DELETE FROM Weather_Daily_Rollup")
+        conn.execute(WEATHER_ROLLUP_INSERT.format(where=''))
+        return
+    insert = WEATHER_ROLLUP_INSERT.format(where='AND city = ? AND date = ?')
+    for key in sorted(set(keys)):
+        conn.execute("DELETE FROM Weather_Daily_Rollup WHERE city = ? AND date = ?", key)
+        conn.execute(insert, key)
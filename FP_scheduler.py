@@ -0,0 +1,211 @@
+import argparse
+import json
+import os
+import signal
+import threading
+import time
+from datetime import datetime, timedelta
+from FP_hotel_database import BookingScraper, TokenBucketRateLimiter
+from FP_hotel_sweep import nightly_date_ranges
+from FP_weather_request import update_cache, get_json_content
+from FP_weather_database import (
+    set_up_database,
+    create_weather_type_table,
+    create_weather_data_table,
+    ingest_new_weather_data
+)
+from FP_ingest_state import create_ingest_state_table
+from FP_http_client import close_session
+from FP_metrics import METRICS
+
+"""
+Long-running scheduler for the Weather-or-Not pipeline.
+
+One process keeps the hotel and weather database connections, the shared HTTP
+session and the scrape rate limiter warm, and runs recurring jobs on their own
+intervals: a hotel scrape over the upcoming check-in dates, and an hourly
+weather refresh plus ingest for every city. When a run hits upstream rate
+limits (429/503 or exhausted retries) the job's next interval is doubled, up
+to max_backoff_seconds, and it returns to its normal interval after a clean run.
+"""
+
+DEFAULT_CONFIG = {
+    "hotel_db": "weather_hotel_data.db",
+    "weather_db": "weather.db",
+    "cache_file": "weather_cache.db",
+    "cities_file": "cities_weather_coords.json",
+    "cities": ["Detroit", "New York", "Chicago", "Miami", "Los Angeles"],
+    "scrape_interval_seconds": 6 * 3600,
+    "scrape_days_ahead": 7,
+    "length_of_stay": 1,
+    "scrape_workers": 4,
+    "scrape_rate": 0.5,
+    "scrape_burst": 2,
+    "weather_interval_seconds": 3600,
+    "weather_lookback_days": 2,
+    "weather_max_new_entries": 25,
+    "max_backoff_seconds": 24 * 3600,
+    "metrics_json": "run_report.json",
+    "metrics_prom": "run_metrics.prom"
+}
+
+
+def load_config(path=None):
+    """DEFAULT_CONFIG overridden by the keys of a JSON file, if given"""
+    config = dict(DEFAULT_CONFIG)
+    if path:
+        with open(path, 'r', encoding='utf-8') as f:
+            config.update(json.load(f))
+    return config
+
+
+class ScheduledJob:
+    def __init__(self, name, interval_seconds, run, max_backoff_seconds=DEFAULT_CONFIG["max_backoff_seconds"]):
+        """A callable repeated every interval_seconds, backing off while throttled"""
+        self.name = name
+        self.interval_seconds = interval_seconds
+        self.run = run
+        self.max_backoff_seconds = max_backoff_seconds
+        self.backoff_level = 0
+        self.next_run = 0.0
+
+    def delay(self):
+        """Seconds until the next run at the current backoff level"""
+        return min(self.interval_seconds * 2 ** self.backoff_level,
+                   max(self.interval_seconds, self.max_backoff_seconds))
+
+
+class Scheduler:
+    def __init__(self, jobs, clock=time.monotonic, on_job_done=None):
+        """Runs jobs one at a time, always picking the one due soonest"""
+        self.jobs = jobs
+        self.clock = clock
+        self.on_job_done = on_job_done
+        self.stop_event = threading.Event()
+
+    def stop(self):
+        self.stop_event.set()
+
+    def run_job(self, job):
+        """Run one job and schedule its next run; returns whether it was throttled"""
+        throttled_before = METRICS.total('rate_limited')
+        failed = False
+        try:
+            with METRICS.span('job', job=job.name):
+                job.run()
+        except Exception as e:
+            failed = True
+            METRICS.incr('job_failures', job=job.name)
+            print(f"Job {job.name} failed: {e}")
+        throttled = METRICS.total('rate_limited') > throttled_before
+
+        if throttled:
+            job.backoff_level += 1
+            METRICS.incr('backoffs', job=job.name)
+        elif not failed:
+            job.backoff_level = 0
+        job.next_run = self.clock() + job.delay()
+        if throttled:
+            print(f"Job {job.name} was rate limited; next run in {job.delay():.0f}s")
+        if self.on_job_done:
+            self.on_job_done(job)
+        return throttled
+
+    def run_forever(self, max_runs=None):
+        """Run due jobs until stop() is called or max_runs jobs have run"""
+        runs = 0
+        while not self.stop_event.is_set() and self.jobs:
+            job = min(self.jobs, key=lambda j: j.next_run)
+            wait_seconds = job.next_run - self.clock()
+            if wait_seconds > 0 and self.stop_event.wait(wait_seconds):
+                break
+            self.run_job(job)
+            runs += 1
+            if max_runs is not None and runs >= max_runs:
+                break
+
+
+class PipelineDaemon:
+    def __init__(self, config):
+        """Open the long-lived connections and build the job list"""
+        self.config = config
+        self.scraper = BookingScraper(
+            db_path=config["hotel_db"],
+            rate_limiter=TokenBucketRateLimiter(rate=config["scrape_rate"], capacity=config["scrape_burst"])
+        )
+        self.cur, self.conn = set_up_database(config["weather_db"])
+        create_weather_type_table(self.cur, self.conn)
+        create_weather_data_table(self.cur, self.conn)
+        create_ingest_state_table(self.cur, self.conn)
+        self.city_dict = get_json_content(config["cities_file"])
+
+        max_backoff = config["max_backoff_seconds"]
+        self.jobs = [ScheduledJob("scrape", config["scrape_interval_seconds"], self.scrape_hotels, max_backoff)]
+        for city, coords in self.city_dict.items():
+            self.jobs.append(ScheduledJob(
+                f"weather:{city}", config["weather_interval_seconds"],
+                lambda city=city, coords=coords: self.refresh_weather(city, coords), max_backoff
+            ))
+        self.scheduler = Scheduler(self.jobs, on_job_done=self.write_metrics)
+
+    def scrape_hotels(self):
+        """Scrape every configured city for the upcoming check-in dates"""
+        start = datetime.now() + timedelta(days=1)
+        for check_in_date, check_out_date in nightly_date_ranges(
+            start, self.config["scrape_days_ahead"], self.config["length_of_stay"]
+        ):
+            self.scraper.scrape_multiple_cities(
+                self.config["cities"], check_in_date, check_out_date,
+                max_workers=self.config["scrape_workers"], incremental=True
+            )
+
+    def refresh_weather(self, city, coords):
+        """Fill the city's recent weather history and ingest the new hours"""
+        end = datetime.now().replace(minute=0, second=0, microsecond=0)
+        days = self.config["weather_lookback_days"]
+        added = update_cache({city: coords}, self.config["cache_file"], start_date=end - timedelta(days=days),
+                             num_days=days, max_new_entries=self.config["weather_max_new_entries"])
+        if added:
+            ingest_new_weather_data(self.cur, self.conn, self.config["cache_file"])
+        print(f"Weather refresh for {city}: {added} new entries")
+
+    def write_metrics(self, job):
+        """Refresh the metrics files after every job so they can be scraped live"""
+        METRICS.write_json(self.config["metrics_json"])
+        METRICS.write_prometheus(self.config["metrics_prom"])
+
+    def run(self, max_runs=None):
+        self.scheduler.run_forever(max_runs=max_runs)
+
+    def stop(self, *args):
+        print("Stopping scheduler after the current job...")
+        self.scheduler.stop()
+
+    def close(self):
+        self.scraper.close()
+        self.conn.close()
+        close_session()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the Weather-or-Not pipeline as a long-lived scheduler.")
+    parser.add_argument('--config', default=None, help="JSON file overriding the default schedule and paths")
+    parser.add_argument('--max-runs', type=int, default=None, help="stop after this many job runs")
+    args = parser.parse_args(argv)
+
+    config = load_config(args.config)
+    if not os.path.exists(config["cities_file"]):
+        print(f"Missing '{config['cities_file']}' with city coordinates.")
+        return
+
+    daemon = PipelineDaemon(config)
+    signal.signal(signal.SIGTERM, daemon.stop)
+    signal.signal(signal.SIGINT, daemon.stop)
+    try:
+        daemon.run(max_runs=args.max_runs)
+    finally:
+        daemon.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+"""
+Managed schema for the hotel and weather databases.
+
+All tables and indexes are created through numbered migrations. Each database
+records the last migration it has applied in PRAGMA user_version, so existing
+databases are upgraded in place and new ones are built by the same steps.
+apply_pragmas tunes a connection: WAL journaling, synchronous=NORMAL and a
+larger page cache.
+"""
+from FP_rollup import HOTEL_ROLLUP_DDL, WEATHER_ROLLUP_DDL, refresh_hotel_rollup, refresh_weather_rollup
+from FP_price_history import (
+    HOTEL_DIMENSION_DDL, PRICE_OBSERVATION_DDL, PRICE_OBSERVATION_INDEX, PRICE_SCRAPE_DDL, HOTELS_VIEW_DDL,
+    HOTELS_VIEW_INDEXES, backfill_price_history
+)
+
+
+DEFAULT_CACHE_SIZE_KB = 64 * 1024
+
+
+def apply_pragmas(conn, cache_size_kb=DEFAULT_CACHE_SIZE_KB):
+    """
+    Enables WAL, relaxes fsyncs to synchronous=NORMAL (safe with WAL), sizes
+    the page cache and keeps temporary tables and indexes in memory.
+    """
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(f"PRAGMA cache_size=-{int(cache_size_kb)}")
+    conn.execute("PRAGMA temp_store=MEMORY")
+
+
+def _columns(conn, table):
+    return [row[1] for row in conn.execute(f"PRAGMA table_xinfo({table})")]
+
+
+def _object_type(conn, name):
+    row = conn.execute("SELECT type FROM sqlite_master WHERE name = ?", (name,)).fetchone()
+    return row[0] if row else None
+
+
+def _hotels_base(conn):
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS hotels (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            hotel_name TEXT,
+            location TEXT,
+            price REAL,
+            rating REAL,
+            review_count INTEGER,
+            scrape_date TEXT,
+            check_in_date TEXT
+        )
+    ''')
+
+
+def _hotels_indexes(conn):
+    # (location, check_in_date) filters and joins; price is included so the
+    # weather join and price aggregates are answered from the index alone
+    conn.execute("DROP INDEX IF EXISTS idx_hotels_location_check_in")
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_hotels_location_check_in_price
+        ON hotels (location, check_in_date, price)
+    ''')
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_hotels_check_in ON hotels (check_in_date)")
+
+
+def _weather_base(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS Weather_Type (
+            id INTEGER PRIMARY KEY,
+            title TEXT UNIQUE
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS Weather_Data (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            city TEXT,
+            datetime TEXT,
+            temp REAL,
+            humidity REAL,
+            wind_speed REAL,
+            description TEXT,
+            weather_type_id INTEGER,
+            is_extreme INTEGER,
+            UNIQUE(city, datetime),
+            FOREIGN KEY(weather_type_id) REFERENCES Weather_Type(id)
+        )
+    """)
+
+
+def _weather_date_column(conn):
+    # Generated YYYY-MM-DD column so joins on hotel check-in dates use an index;
+    # the covering index also carries weather type and temperature
+    if "date" not in _columns(conn, "Weather_Data"):
+        conn.execute("""
+            ALTER TABLE Weather_Data
+            ADD COLUMN date TEXT GENERATED ALWAYS AS (substr(datetime, 1, 10)) VIRTUAL
+        """)
+    conn.execute("DROP INDEX IF EXISTS idx_weather_data_city_date")
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_weather_data_city_date_type_temp
+        ON Weather_Data (city, date, weather_type_id, temp)
+    ''')
+
+
+def _weather_type_title_nocase(conn):
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_weather_type_title_nocase ON Weather_Type (title COLLATE NOCASE)")
+
+
+def _hotels_rollup(conn):
+    # Filled by _hotels_view, once hotels has the scrapes weight
+    conn.execute(HOTEL_ROLLUP_DDL)
+
+
+def _hotels_price_history(conn):
+    conn.execute(HOTEL_DIMENSION_DDL)
+    conn.execute(PRICE_OBSERVATION_DDL)
+    conn.execute(PRICE_OBSERVATION_INDEX)
+    conn.execute(PRICE_SCRAPE_DDL)
+    backfill_price_history(conn)
+
+
+def _hotels_keyset_indexes(conn):
+    # Single-column indexes also order by rowid, so (price, id) and
+    # (rating, id) keyset pages in FP_hotel_query are plain index range scans
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_hotels_price ON hotels (price)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_hotels_rating ON hotels (rating)")
+
+
+def _hotels_view(conn):
+    # hotel + price_observation become the only copy of scraped hotels; the
+    # per-scrape table is dropped and replaced by a view with its columns.
+    # The rollup is rebuilt from the view.
+    conn.execute(PRICE_SCRAPE_DDL)
+    if _object_type(conn, 'hotels') == 'table':
+        conn.execute('''
+            INSERT OR IGNORE INTO price_scrape (location, check_in_date, scrape_date)
+            SELECT DISTINCT location, check_in_date, scrape_date FROM hotels
+            WHERE location IS NOT NULL AND check_in_date IS NOT NULL AND scrape_date IS NOT NULL
+        ''')
+        conn.execute("DROP TABLE hotels")
+    conn.execute(HOTELS_VIEW_DDL)
+    for index in HOTELS_VIEW_INDEXES:
+        conn.execute(index)
+    refresh_hotel_rollup(conn)
+
+
+def _hotels_view_scrapes(conn):
+    # Recreate the view with its per-run `scrapes` weight and re-weight the rollup
+    conn.execute("DROP VIEW IF EXISTS hotels")
+    conn.execute(HOTELS_VIEW_DDL)
+    refresh_hotel_rollup(conn)
+
+
+def _weather_rollup(conn):
+    conn.execute(WEATHER_ROLLUP_DDL)
+    refresh_weather_rollup(conn)
+
+
+HOTEL_MIGRATIONS = [
+    _hotels_base,
+    _hotels_indexes,
+    _hotels_rollup,
+    _hotels_price_history,
+    _hotels_keyset_indexes,
+    _hotels_view,
+    _hotels_view_scrapes,
+]
+
+WEATHER_MIGRATIONS = [
+    _weather_base,
+    _weather_date_column,
+    _weather_type_title_nocase,
+    _weather_rollup,
+]
+
+
+def migrate(conn, migrations):
+    """
+    Applies every migration newer than the database's user_version, each in
+    its own transaction. Returns the resulting schema version.
+
+    The transaction is opened with an explicit BEGIN: in sqlite3's default
+    isolation mode only DML starts one implicitly, so CREATE/ALTER/DROP would
+    otherwise autocommit one by one. A failed step leaves neither its DDL nor
+    its version bump behind.
+    """
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    for number, migration in enumerate(migrations, start=1):
+        if number <= version:
+            continue
+        conn.execute("BEGIN")
+        try:
+            migration(conn)
+            conn.execute(f"PRAGMA user_version = {number}")
+        except BaseException:
+            conn.rollback()
+            raise
+        conn.commit()
+        version = number
+    return version
+
+
+def ensure_hotel_schema(conn):
+    """Bring a hotel database up to the current schema"""
+    return migrate(conn, HOTEL_MIGRATIONS)
+
+
+def ensure_weather_schema(conn):
+    """Bring a weather database up to the current schema"""
+    return migrate(conn, WEATHER_MIGRATIONS)
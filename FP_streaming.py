@@ -0,0 +1,196 @@
+import math
+import random
+from collections import Counter
+from itertools import groupby
+from operator import itemgetter
+
+"""
+Streaming hotel/weather aggregation for datasets larger than memory.
+
+Hotels and weather rows are read in chunks, both sorted by (city, date), and
+merge-joined one (city, date) group at a time. Each group updates mergeable
+accumulators (sums, counts and co-moments), so memory is bounded by the size
+of a single group instead of the size of the tables. The results match the
+in-memory merge, where every hotel row is paired with every weather row of
+the same city and day.
+"""
+
+HOTEL_STREAM_QUERY = '''
+    SELECT location, check_in_date, price, scrapes
+    FROM hotels
+    WHERE location IS NOT NULL AND check_in_date IS NOT NULL
+    ORDER BY location, check_in_date
+'''
+
+WEATHER_STREAM_QUERY = '''
+    SELECT wd.city, wd.date, wd.temp, wt.title
+    FROM Weather_Data wd
+    JOIN Weather_Type wt ON wd.weather_type_id = wt.id
+    WHERE wd.city IS NOT NULL AND wd.date IS NOT NULL
+    ORDER BY wd.city, wd.date
+'''
+
+
+def iter_query_chunks(conn, query, params=(), chunksize=10000):
+    """
+    Yields the rows of a query, fetching chunksize rows at a time.
+    """
+    cursor = conn.cursor()
+    cursor.execute(query, params)
+    while True:
+        rows = cursor.fetchmany(chunksize)
+        if not rows:
+            break
+        yield from rows
+
+
+def merge_join_groups(left_rows, right_rows):
+    """
+    Inner-joins two row streams sorted by their first two columns.
+    Yields (key, left_group, right_group) for every key present in both.
+    """
+    key = itemgetter(0, 1)
+    left = groupby(left_rows, key)
+    right = groupby(right_rows, key)
+    left_group = next(left, None)
+    right_group = next(right, None)
+    while left_group is not None and right_group is not None:
+        if left_group[0] < right_group[0]:
+            left_group = next(left, None)
+        elif left_group[0] > right_group[0]:
+            right_group = next(right, None)
+        else:
+            yield left_group[0], list(left_group[1]), list(right_group[1])
+            left_group = next(left, None)
+            right_group = next(right, None)
+
+
+class RunningMoments:
+    def __init__(self):
+        """Mergeable count, means and co-moments of (x, y) pairs"""
+        self.n = 0
+        self.mean_x = 0.0
+        self.mean_y = 0.0
+        self.m2x = 0.0
+        self.m2y = 0.0
+        self.cxy = 0.0
+
+    def merge(self, n, mean_x, mean_y, m2x, m2y, cxy=0.0):
+        """Combine the moments of another batch of n pairs (Chan et al.)"""
+        if n == 0:
+            return
+        total = self.n + n
+        dx = mean_x - self.mean_x
+        dy = mean_y - self.mean_y
+        weight = self.n * n / total
+        self.m2x += m2x + dx * dx * weight
+        self.m2y += m2y + dy * dy * weight
+        self.cxy += cxy + dx * dy * weight
+        self.mean_x += dx * n / total
+        self.mean_y += dy * n / total
+        self.n = total
+
+    def correlation(self):
+        """Pearson correlation of all merged pairs, NaN when undefined"""
+        if self.n < 2:
+            return float('nan')
+        denominator = math.sqrt(self.m2x * self.m2y)
+        return self.cxy / denominator if denominator > 0 else float('nan')
+
+
+class GroupMeans:
+    def __init__(self):
+        """Running weighted sums and counts per group key"""
+        self.groups = {}
+
+    def add(self, key, total, count):
+        acc = self.groups.setdefault(key, [0.0, 0])
+        acc[0] += total
+        acc[1] += count
+
+    def means(self):
+        """{key: mean} sorted by key; NaN for groups without values"""
+        return {
+            key: (total / count if count else float('nan'))
+            for key, (total, count) in sorted(self.groups.items())
+        }
+
+
+class StreamingStats:
+    def __init__(self, sample_size=10000, seed=0):
+        """Accumulators for every analysis in WeatherHotelAnalyzer"""
+        self.groups = 0
+        self.rows = 0
+        self.city_price = GroupMeans()
+        self.city_temp = GroupMeans()
+        self.location_weather_price = GroupMeans()
+        self.weather_price = GroupMeans()
+        self.temp_price = GroupMeans()
+        self.moments = RunningMoments()
+        self.sample_size = sample_size
+        self.sample = []
+        self._pairs_seen = 0
+        self._random = random.Random(seed)
+
+    def add_group(self, location, prices, weather):
+        """
+        Adds one (city, date) group: the hotel prices and the (temp, weather_type)
+        rows of that day. Every hotel row pairs with every weather row.
+        """
+        n_hotels = len(prices)
+        n_weather = len(weather)
+        hotel_prices = [p for p in prices if p is not None]
+        temps = [t for t, _ in weather if t is not None]
+        price_sum = sum(hotel_prices)
+
+        self.groups += 1
+        self.rows += n_hotels * n_weather
+        self.city_price.add(location, price_sum * n_weather, len(hotel_prices) * n_weather)
+        self.city_temp.add(location, sum(temps) * n_hotels, len(temps) * n_hotels)
+
+        for weather_type, count in Counter(title for _, title in weather).items():
+            self.location_weather_price.add((location, weather_type), price_sum * count, len(hotel_prices) * count)
+            self.weather_price.add(weather_type, price_sum * count, len(hotel_prices) * count)
+
+        for temp, count in Counter(temps).items():
+            self.temp_price.add(temp, price_sum * count, len(hotel_prices) * count)
+
+        if hotel_prices and temps:
+            mean_price = price_sum / len(hotel_prices)
+            mean_temp = sum(temps) / len(temps)
+            # Within one group price and temp vary independently, so cxy is 0
+            self.moments.merge(
+                len(hotel_prices) * len(temps),
+                mean_price,
+                mean_temp,
+                len(temps) * sum((p - mean_price) ** 2 for p in hotel_prices),
+                len(hotel_prices) * sum((t - mean_temp) ** 2 for t in temps)
+            )
+            self._sample_pairs(hotel_prices, temps)
+
+    def _sample_pairs(self, prices, temps):
+        """Reservoir-sample (temp, price) pairs for the scatter plot"""
+        for temp in temps:
+            for price in prices:
+                self._pairs_seen += 1
+                if len(self.sample) < self.sample_size:
+                    self.sample.append((temp, price))
+                else:
+                    slot = self._random.randrange(self._pairs_seen)
+                    if slot < self.sample_size:
+                        self.sample[slot] = (temp, price)
+
+
+def stream_hotel_weather_stats(hotel_conn, weather_conn, chunksize=10000, sample_size=10000):
+    """
+    Streams both databases and returns the filled StreamingStats.
+    Weather_Data must have the generated date column (FP_schema.ensure_weather_schema).
+    """
+    stats = StreamingStats(sample_size=sample_size)
+    hotel_rows = iter_query_chunks(hotel_conn, HOTEL_STREAM_QUERY, chunksize=chunksize)
+    weather_rows = iter_query_chunks(weather_conn, WEATHER_STREAM_QUERY, chunksize=chunksize)
+    for (location, _), hotels, weather in merge_join_groups(hotel_rows, weather_rows):
+        # Each hotels row is a price run standing for `scrapes` per-scrape rows
+        prices = [row[2] for row in hotels for _ in range(row[3])]
+        stats.add_group(location, prices, [(row[2], row[3]) for row in weather])
+    return stats
@@ -0,0 +1,233 @@
+import sqlite3
+import json
+import os
+
+"""
+Append-only weather cache backed by a SQLite key-value table.
+
+Entries are keyed by build_cache_key (city + datetime). Adding new entries
+only touches the new keys, lookups go through the primary key index, and
+every write happens inside a transaction so a crash mid-write leaves the
+cache as it was before the update. Rows get increasing ids in insertion order,
+so readers can pick up everything added since a given id, whatever its datetime.
+"""
+
+CACHE_TABLE_DDL = """
+    CREATE TABLE IF NOT EXISTS weather_cache (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        key TEXT NOT NULL UNIQUE,
+        city TEXT,
+        datetime TEXT,
+        value TEXT
+    )
+"""
+
+
+class WeatherCache:
+    def __init__(self, path='weather_cache.db'):
+        """Open (or create) the cache database"""
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self._add_insertion_ids()
+        self.conn.execute(CACHE_TABLE_DDL)
+        self.conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_weather_cache_city_datetime ON weather_cache (city, datetime)"
+        )
+        self.conn.execute("CREATE TABLE IF NOT EXISTS cache_meta (name TEXT PRIMARY KEY, value TEXT)")
+        self.conn.commit()
+
+    def _add_insertion_ids(self):
+        """Rebuilds a cache created before rows had ids, keeping their insertion order"""
+        columns = [row[1] for row in self.conn.execute("PRAGMA table_info(weather_cache)")]
+        if not columns or 'id' in columns:
+            return
+        self.conn.execute("BEGIN")
+        try:
+            self.conn.execute("ALTER TABLE weather_cache RENAME TO weather_cache_old")
+            self.conn.execute(CACHE_TABLE_DDL)
+            self.conn.execute("""
+                INSERT INTO weather_cache (key, city, datetime, value)
+                SELECT key, city, datetime, value FROM weather_cache_old ORDER BY rowid
+            """)
+            self.conn.execute("DROP TABLE weather_cache_old")
+        except BaseException:
+            self.conn.rollback()
+            raise
+        self.conn.commit()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def __contains__(self, key):
+        row = self.conn.execute("SELECT 1 FROM weather_cache WHERE key = ?", (key,)).fetchone()
+        return row is not None
+
+    def __len__(self):
+        return self.conn.execute("SELECT COUNT(*) FROM weather_cache").fetchone()[0]
+
+    def get(self, key, default=None):
+        """Point lookup of a single entry by cache key"""
+        row = self.conn.execute("SELECT value FROM weather_cache WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def keys(self):
+        for (key,) in self.conn.execute("SELECT key FROM weather_cache ORDER BY key"):
+            yield key
+
+    def items(self):
+        for key, value in self.conn.execute("SELECT key, value FROM weather_cache ORDER BY key"):
+            yield key, json.loads(value)
+
+    def values(self):
+        for _, value in self.items():
+            yield value
+
+    def cities(self):
+        """Distinct cities present in the cache"""
+        return [row[0] for row in self.conn.execute("SELECT DISTINCT city FROM weather_cache ORDER BY city")]
+
+    def entries_since(self, city, after=None):
+        """
+        Yields (key, entry) pairs for a city with a datetime strictly newer than
+        `after`, oldest first. Served from the (city, datetime) index.
+        """
+        if after is None:
+            rows = self.conn.execute(
+                "SELECT key, value FROM weather_cache WHERE city = ? ORDER BY datetime",
+                (city,)
+            )
+        else:
+            rows = self.conn.execute(
+                "SELECT key, value FROM weather_cache WHERE city = ? AND datetime > ? ORDER BY datetime",
+                (city, after)
+            )
+        for key, value in rows:
+            yield key, json.loads(value)
+
+    def last_id(self):
+        """Id of the most recently added entry, 0 for an empty cache"""
+        return self.conn.execute("SELECT COALESCE(MAX(id), 0) FROM weather_cache").fetchone()[0]
+
+    def entries_added(self, after_id=0, up_to_id=None):
+        """
+        Yields entries with after_id < id <= up_to_id in insertion order,
+        straight off the primary key.
+        """
+        if up_to_id is None:
+            up_to_id = self.last_id()
+        rows = self.conn.execute(
+            "SELECT value FROM weather_cache WHERE id > ? AND id <= ? ORDER BY id",
+            (after_id, up_to_id)
+        )
+        for (value,) in rows:
+            yield json.loads(value)
+
+    def cached_datetimes(self, city, start_dt, end_dt):
+        """
+        Coverage index: the set of datetimes cached for a city with
+        start_dt <= datetime <= end_dt ('YYYY-MM-DD HH:MM:SS' strings).
+        """
+        rows = self.conn.execute(
+            "SELECT datetime FROM weather_cache WHERE city = ? AND datetime BETWEEN ? AND ?",
+            (city, start_dt, end_dt)
+        )
+        return {row[0] for row in rows}
+
+    def add_many(self, entries):
+        """
+        Appends new entries from a {key: entry} dict, or any iterable of
+        (key, entry) pairs, in a single transaction. Pairs are serialized as
+        executemany consumes them. Existing keys are left untouched. Returns
+        the number of keys added.
+        """
+        items = entries.items() if isinstance(entries, dict) else entries
+        rows = (
+            (key, entry.get("city"), entry.get("datetime"), json.dumps(entry))
+            for key, entry in items
+        )
+        before = self.conn.total_changes
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO weather_cache (key, city, datetime, value) VALUES (?, ?, ?, ?)",
+                rows
+            )
+        return self.conn.total_changes - before
+
+    def add_columns(self, keys, columns):
+        """
+        Appends new entries given column-wise: keys[i] gets the entry
+        {field: columns[field][i]}. Rows go to one executemany straight from
+        zip(*columns), without building the entries first. Existing keys are
+        left untouched. Returns the number of keys added.
+        """
+        fields = list(columns)
+        rows = (
+            (key, city, dt, json.dumps(dict(zip(fields, values))))
+            for key, city, dt, values in zip(keys, columns["city"], columns["datetime"], zip(*columns.values()))
+        )
+        before = self.conn.total_changes
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO weather_cache (key, city, datetime, value) VALUES (?, ?, ?, ?)",
+                rows
+            )
+        return self.conn.total_changes - before
+
+    def get_meta(self, name, default=None):
+        row = self.conn.execute("SELECT value FROM cache_meta WHERE name = ?", (name,)).fetchone()
+        return row[0] if row else default
+
+    def set_meta(self, name, value):
+        with self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO cache_meta (name, value) VALUES (?, ?)", (name, value))
+
+    def close(self):
+        if self.conn:
+            self.conn.close()
+            self.conn = None
+
+
+def migrate_json_cache(json_file, cache):
+    """
+    Copies entries from a legacy weather_cache.json into a WeatherCache, once:
+    the file's size and modification time are recorded in the cache, and an
+    unchanged file is not parsed again. Returns the number of entries that
+    were not already cached.
+    """
+    try:
+        stat = os.stat(json_file)
+    except OSError:
+        return 0
+    name = f"migrated:{os.path.abspath(json_file)}"
+    marker = f"{stat.st_size}:{stat.st_mtime_ns}"
+    if cache.get_meta(name) == marker:
+        return 0
+    try:
+        with open(json_file, 'r', encoding='utf-8') as f:
+            legacy = json.load(f)
+    except (OSError, ValueError):
+        legacy = None
+    added = cache.add_many(legacy) if isinstance(legacy, dict) else 0
+    cache.set_meta(name, marker)
+    return added
+
+
+def load_cache(filename):
+    """
+    Loads every cached entry as a {key: entry} dict from either a SQLite
+    cache file or a legacy JSON cache file.
+    """
+    if filename.endswith('.json'):
+        try:
+            with open(filename, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+    if not os.path.exists(filename):
+        return {}
+    with WeatherCache(filename) as cache:
+        return dict(cache.items())
@@ -1,6 +1,14 @@
 import sqlite3
-import json
 import os
+import time
+from FP_weather_cache import WeatherCache, load_cache
+from FP_ingest_state import get_high_water_mark, set_high_water_mark
+from FP_schema import apply_pragmas, ensure_weather_schema
+from FP_metrics import METRICS
+from FP_rollup import refresh_weather_rollup
+
+WEATHER_SOURCE = "weather_cache_id"
+ALL_CITIES = "*"
 
 # Mapping API weather descriptions to standardized types
 WEATHER_MAPPING = {
@@ -21,6 +29,7 @@ def set_up_database(db_name):
     Sets up SQLite database connection and returns cursor and connection.
     """
     conn = sqlite3.connect(db_name)
+    apply_pragmas(conn)
     cur  = conn.cursor()
     return cur, conn
 
@@ -31,12 +40,7 @@ def create_weather_type_table(cur, conn):
     """
     weather_types = ["Sunny", "Rainy", "Snowy", "Windy", "Tornado", "Blizzard", "Cloudy", "Foggy", "Clear"]
 
-    cur.execute("""
-        CREATE TABLE IF NOT EXISTS Weather_Type (
-            id INTEGER PRIMARY KEY, 
-            title TEXT UNIQUE
-        )
-    """)
+    ensure_weather_schema(conn)
 
     for i, wt in enumerate(weather_types):
         cur.execute("INSERT OR IGNORE INTO Weather_Type (id, title) VALUES (?, ?)", (i, wt))
@@ -46,77 +50,147 @@ def create_weather_type_table(cur, conn):
 def create_weather_data_table(cur, conn):
     """
     Creates the Weather_Data table to store historical weather entries.
+    Table and index definitions live in FP_schema's migrations.
     """
-    cur.execute("""
-        CREATE TABLE IF NOT EXISTS Weather_Data (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            city TEXT,
-            datetime TEXT,
-            temp REAL,
-            humidity REAL,
-            wind_speed REAL,
-            description TEXT,
-            weather_type_id INTEGER,
-            is_extreme INTEGER,
-            UNIQUE(city, datetime),
-            FOREIGN KEY(weather_type_id) REFERENCES Weather_Type(id)
-        )
-    """)
-    conn.commit()
+    ensure_weather_schema(conn)
 
 def load_weather_data(filename):
     """
-    Loads JSON weather data from a cache file.
+    Loads weather data from a cache file (SQLite cache or legacy JSON).
     """
-    try:
-        with open(filename, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    except:
-        return {}
+    return load_cache(filename)
 
 def get_weather_type_id(cur, weather_type):
     """
     Normalizes weather type and returns corresponding Weather_Type ID.
     """
     normalized = WEATHER_MAPPING.get(weather_type.lower(), weather_type)
-    cur.execute("SELECT id FROM Weather_Type WHERE LOWER(title) = ?", (normalized.lower(),))
+    cur.execute("SELECT id FROM Weather_Type WHERE title = ? COLLATE NOCASE", (normalized,))
     result = cur.fetchone()
     return result[0] if result else None
 
-def insert_weather_data(cur, conn, data):
+def load_weather_type_lookup(cur):
+    """
+    Loads Weather_Type once into a {lowercase title: id} dictionary.
+    """
+    cur.execute("SELECT id, title FROM Weather_Type")
+    return {title.lower(): type_id for type_id, title in cur.fetchall()}
+
+def resolve_weather_type_id(lookup, weather_type):
+    """
+    Normalizes weather type through WEATHER_MAPPING and resolves it against a preloaded lookup.
+    """
+    if not weather_type:
+        return None
+    normalized = WEATHER_MAPPING.get(weather_type.lower(), weather_type)
+    return lookup.get(normalized.lower())
+
+INSERT_WEATHER_SQL = """
+    INSERT OR IGNORE INTO Weather_Data
+    (city, datetime, temp, humidity, wind_speed, description, weather_type_id, is_extreme)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+def insert_weather_data(cur, conn, data, chunk_size=10000):
     """
     Inserts parsed weather data into the database.
     Prevents duplicates using city + datetime.
     Links to Weather_Type via foreign key.
+
+    Weather types are resolved against a dictionary loaded once, and rows are
+    written with executemany in chunks of chunk_size, one transaction per chunk.
+    Each chunk's transaction also refreshes Weather_Daily_Rollup for the days
+    it touched, so the rollup never disagrees with committed rows.
+    Accepts a {key: entry} dict or any iterable of entries.
     """
+    lookup = load_weather_type_lookup(cur)
+    entries = data.values() if isinstance(data, dict) else data
+
+    start = time.perf_counter()
     count = 0
-    for entry in data.values():
-        city = entry.get("city")
-        dt = entry.get("datetime")
-        temp = entry.get("temp")
-        humidity = entry.get("humidity")
-        wind = entry.get("wind_speed")
-        description = entry.get("description")
+    unknown = {}
+    batch = []
+    seen = 0
+    for entry in entries:
+        seen += 1
         weather = entry.get("weather")
-        is_extreme = entry.get("is_extreme", 0)
-
-        weather_type_id = get_weather_type_id(cur, weather)
+        weather_type_id = resolve_weather_type_id(lookup, weather)
         if weather_type_id is None:
-            print(f"⚠️ Skipping unknown weather type: '{weather}' in {city} at {dt}")
+            unknown[weather] = unknown.get(weather, 0) + 1
             continue
 
-        try:
-            cur.execute("""
-                INSERT OR IGNORE INTO Weather_Data 
-                (city, datetime, temp, humidity, wind_speed, description, weather_type_id, is_extreme)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            """, (city, dt, temp, humidity, wind, description, weather_type_id, is_extreme))
-            count += 1
-        except Exception as e:
-            print(f"Insert failed for {city} @ {dt}: {e}")
-
-    conn.commit()
-    print(f"Inserted {count} new rows into Weather_Data.")
+        batch.append((
+            entry.get("city"),
+            entry.get("datetime"),
+            entry.get("temp"),
+            entry.get("humidity"),
+            entry.get("wind_speed"),
+            entry.get("description"),
+            weather_type_id,
+            entry.get("is_extreme", 0)
+        ))
+        if len(batch) >= chunk_size:
+            count += _insert_weather_batch(cur, conn, batch)
+            batch = []
+    if batch:
+        count += _insert_weather_batch(cur, conn, batch)
+
+    elapsed = time.perf_counter() - start
+    METRICS.observe('db_write', elapsed, table='Weather_Data')
+    METRICS.incr('rows_inserted', count, table='Weather_Data')
+    METRICS.incr('rows_skipped', seen - count, table='Weather_Data')
+    for weather, skipped in unknown.items():
+        print(f"⚠️ Skipped {skipped} rows with unknown weather type: '{weather}'")
+    rate = count / elapsed if elapsed > 0 else 0.0
+    print(f"Inserted {count} new rows into Weather_Data in {elapsed:.2f}s ({rate:,.0f} rows/s).")
+    return count
+
+def _insert_weather_batch(cur, conn, batch):
+    """
+    Writes one chunk and refreshes the rollup for its days in a single
+    transaction. If the chunk fails, it is retried row by row (still one
+    transaction) so one bad row does not drop the others. Returns the number
+    of rows inserted.
+    """
+    days = {(row[0], row[1][:10]) for row in batch if row[0] and row[1]}
+    try:
+        with conn:
+            before = conn.total_changes
+            cur.executemany(INSERT_WEATHER_SQL, batch)
+            inserted = conn.total_changes - before
+            if inserted:
+                refresh_weather_rollup(conn, days)
+    except sqlite3.Error:
+        with conn:
+            before = conn.total_changes
+            for row in batch:
+                try:
+                    cur.execute(INSERT_WEATHER_SQL, row)
+                except sqlite3.Error as e:
+                    print(f"Insert failed for {row[0]} @ {row[1]}: {e}")
+            inserted = conn.total_changes - before
+            if inserted:
+                refresh_weather_rollup(conn, days)
+    return inserted
+
+def ingest_new_weather_data(cur, conn, cache_file):
+    """
+    Incrementally ingests a SQLite weather cache into Weather_Data.
+    The high-water mark is the id of the last cache row ingested, so entries
+    are read in the order they were added to the cache: hours that arrive
+    after newer ones (filled gaps, retried windows) are still picked up.
+    Requires the Ingest_State table (see FP_ingest_state).
+    """
+    with WeatherCache(cache_file) as cache:
+        mark = get_high_water_mark(cur, WEATHER_SOURCE, ALL_CITIES)
+        after_id = int(mark) if mark else 0
+        last_id = cache.last_id()
+        if last_id <= after_id:
+            return 0
+        total = insert_weather_data(cur, conn, cache.entries_added(after_id, last_id))
+        # Zero-padded so Ingest_State's text MAX() orders marks numerically
+        set_high_water_mark(cur, conn, WEATHER_SOURCE, ALL_CITIES, f"{last_id:020d}")
+    return total
 
 def main():
     """
@@ -126,7 +200,7 @@ def main():
     create_weather_type_table(cur, conn)
     create_weather_data_table(cur, conn)
     
-    data = load_weather_data("weather_cache.json")
+    data = load_weather_data("weather_cache.db")
     insert_weather_data(cur, conn, data)
 
 if __name__ == "__main__":
@@ -1,8 +1,12 @@
-import requests
 import json
 import os
 import csv
+import calendar
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
+from itertools import compress
+from FP_weather_cache import WeatherCache, load_cache
+from FP_metrics import METRICS
 
 """
 SI 206 Final Project: Weather History Cacher
@@ -10,7 +14,9 @@ Author: Ixsaael Hernandez
 Date: 4-20-2025
 
 This script fetches historical weather data from OpenWeatherMap History API,
-stores up to 25 new hourly data points per run in a JSON cache, and exports it to CSV.
+stores up to 25 new hourly data points per run in a SQLite-backed cache, and exports it to CSV.
+requests, numpy and the API key are loaded on first use, so importing this
+module stays cheap for callers that only touch the cache.
 """
 
 def get_api_key(filename):
@@ -23,7 +29,15 @@ def get_api_key(filename):
     except:
         return ""
 
-API_KEY = get_api_key('api_base_weather_key.txt')
+API_KEY_FILE = 'api_base_weather_key.txt'
+_api_key = None
+
+def load_api_key():
+    """Reads API_KEY_FILE on first call and reuses the key afterwards"""
+    global _api_key
+    if _api_key is None:
+        _api_key = get_api_key(API_KEY_FILE)
+    return _api_key
 
 def get_json_content(filename):
     try:
@@ -32,9 +46,13 @@ def get_json_content(filename):
     except:
         return {}
 
-def save_cache(cache_dict, filename):
-    with open(filename, 'w', encoding='utf-8') as file:
-        json.dump(cache_dict, file, indent=4)
+EXTREME_TEMP_HIGH = 35
+EXTREME_TEMP_LOW = -5
+EXTREME_HUMIDITY = 95
+EXTREME_WIND_SPEED = 30
+EXTREME_WEATHER_TYPES = ["thunderstorm", "blizzard", "tornado"]
+
+HISTORY_FIELDS = ["city", "datetime", "temp", "humidity", "weather", "description", "wind_speed", "is_extreme"]
 
 def is_extreme_weather(entry):
     temp = entry.get("main", {}).get("temp", 0)
@@ -42,33 +60,73 @@ def is_extreme_weather(entry):
     wind = entry.get("wind", {}).get("speed", 0)
     weather = entry.get("weather", [{}])[0].get("main", "").lower()
 
-    extreme_weather_types = ["thunderstorm", "blizzard", "tornado"]
-
     return (
-        temp > 35 or temp < -5 or
-        humidity > 95 or
-        wind > 30 or
-        weather in extreme_weather_types
+        temp > EXTREME_TEMP_HIGH or temp < EXTREME_TEMP_LOW or
+        humidity > EXTREME_HUMIDITY or
+        wind > EXTREME_WIND_SPEED or
+        weather in EXTREME_WEATHER_TYPES
+    )
+
+def parse_history_columns(data, city):
+    """
+    Columnar parse of an API payload: each field is pulled out of the `list`
+    entries as its own column, then timestamps are formatted and
+    extreme-weather flags computed vectorized. Returns a dict of columns
+    keyed like the cached entries.
+    """
+    entries = data.get("list", [])
+    if not entries:
+        # numpy 2.x cannot format an empty datetime64 array; nothing to parse anyway
+        return {field: [] for field in HISTORY_FIELDS}
+
+    import numpy as np
+
+    mains = [entry.get("main", {}) for entry in entries]
+    conditions = [entry.get("weather", [{}])[0] for entry in entries]
+    temps = [main.get("temp") for main in mains]
+    humidities = [main.get("humidity") for main in mains]
+    weathers = [condition.get("main", "") for condition in conditions]
+    descriptions = [condition.get("description", "") for condition in conditions]
+    winds = [entry.get("wind", {}).get("speed") for entry in entries]
+    dts = np.fromiter((entry.get("dt", 0) for entry in entries), dtype='int64', count=len(entries))
+
+    datetimes = np.char.replace(
+        np.datetime_as_string(dts.astype('datetime64[s]'), unit='s'), 'T', ' '
     )
+    # Missing values compare as NaN, which is never extreme (same as the 0 default)
+    temp_arr = np.array(temps, dtype=float)
+    humidity_arr = np.array(humidities, dtype=float)
+    wind_arr = np.array(winds, dtype=float)
+    weather_arr = np.char.lower(np.array(weathers, dtype=str))
+    is_extreme = (
+        (temp_arr > EXTREME_TEMP_HIGH) | (temp_arr < EXTREME_TEMP_LOW) |
+        (humidity_arr > EXTREME_HUMIDITY) |
+        (wind_arr > EXTREME_WIND_SPEED) |
+        np.isin(weather_arr, EXTREME_WEATHER_TYPES)
+    ).astype(int)
+
+    return {
+        "city": [city] * len(entries),
+        "datetime": datetimes.tolist(),
+        "temp": temps,
+        "humidity": humidities,
+        "weather": weathers,
+        "description": descriptions,
+        "wind_speed": winds,
+        "is_extreme": is_extreme.tolist()
+    }
 
 def parse_history_data(data, city):
-    results = []
-    for entry in data.get("list", []):
-        dt = datetime.utcfromtimestamp(entry.get("dt", 0)).strftime('%Y-%m-%d %H:%M:%S')
-        parsed = {
-            "city": city,
-            "datetime": dt,
-            "temp": entry.get("main", {}).get("temp"),
-            "humidity": entry.get("main", {}).get("humidity"),
-            "weather": entry.get("weather", [{}])[0].get("main", ""),
-            "description": entry.get("weather", [{}])[0].get("description", ""),
-            "wind_speed": entry.get("wind", {}).get("speed"),
-            "is_extreme": int(is_extreme_weather(entry))
-        }
-        results.append(parsed)
-    return results
+    columns = parse_history_columns(data, city)
+    return [
+        dict(zip(HISTORY_FIELDS, row))
+        for row in zip(*(columns[field] for field in HISTORY_FIELDS))
+    ]
 
 def fetch_history(city, coords, start_ts, end_ts):
+    import requests
+    from FP_http_client import get_session, is_rate_limited, THROTTLE_STATUSES
+
     url = "https://history.openweathermap.org/data/2.5/history/city"
     params = {
         "lat": coords["lat"],
@@ -76,14 +134,27 @@ def fetch_history(city, coords, start_ts, end_ts):
         "type": "hour",
         "start": start_ts,
         "end": end_ts,
-        "appid": API_KEY,
+        "appid": load_api_key(),
         "units": "metric"
     }
 
-    response = requests.get(url, params=params)
+    METRICS.incr('requests', source='owm')
+    try:
+        with METRICS.span('http_request', source='owm', city=city):
+            response = get_session().get(url, params=params)
+    except requests.exceptions.RequestException as e:
+        METRICS.incr('request_errors', source='owm')
+        if is_rate_limited(e):
+            METRICS.incr('rate_limited', source='owm')
+        print(f"❌ API call failed for {city}: {e}")
+        return None
+    METRICS.incr('response_bytes', len(response.content), source='owm')
     if response.status_code == 200:
         return response.json()
     else:
+        METRICS.incr('request_errors', source='owm')
+        if response.status_code in THROTTLE_STATUSES:
+            METRICS.incr('rate_limited', source='owm')
         print(f"❌ API call failed for {city}: {response.status_code} - {response.text}")
     return None
 
@@ -99,49 +170,180 @@ def get_unix_range_list(start_date, num_days):
         ranges.append((current.strftime('%Y-%m-%d'), start_ts, end_ts))
     return ranges
 
+HOUR = 3600
+MAX_WINDOW_HOURS = 24 * 7  # the History API serves at most one week per call
+
+def ts_to_datetime_str(ts):
+    return datetime.utcfromtimestamp(ts).strftime('%Y-%m-%d %H:%M:%S')
+
+def datetime_str_to_ts(dt_str):
+    return calendar.timegm(datetime.strptime(dt_str, '%Y-%m-%d %H:%M:%S').timetuple())
+
+def plan_missing_windows(cached_hours, start_ts, end_ts, max_window_hours=MAX_WINDOW_HOURS, max_hours=None):
+    """
+    Merges the hours in [start_ts, end_ts) that are not in cached_hours (a set of
+    unix timestamps) into the fewest contiguous (first_hour_ts, last_hour_ts)
+    windows, each at most max_window_hours long. Stops after max_hours hours.
+    """
+    windows = []
+    planned = 0
+    first = last = None
+    hour = -(-start_ts // HOUR) * HOUR
+    while hour < end_ts:
+        if max_hours is not None and planned >= max_hours:
+            break
+        if hour not in cached_hours:
+            if first is not None and hour == last + HOUR and (hour - first) // HOUR < max_window_hours:
+                last = hour
+            else:
+                if first is not None:
+                    windows.append((first, last))
+                first = last = hour
+            planned += 1
+        hour += HOUR
+    if first is not None:
+        windows.append((first, last))
+    return windows
+
+def plan_history_fetches(cache, city_dict, start_ts, end_ts, max_hours=None):
+    """
+    Builds the fetch plan for all cities from the cache's coverage index:
+    a list of (city, coords, first_hour_ts, last_hour_ts) covering only the gaps.
+    """
+    plan = []
+    remaining = max_hours
+    for city, coords in city_dict.items():
+        if remaining is not None and remaining <= 0:
+            break
+        cached = cache.cached_datetimes(city, ts_to_datetime_str(start_ts), ts_to_datetime_str(end_ts))
+        cached_hours = {datetime_str_to_ts(dt) for dt in cached}
+        METRICS.incr('cache_hits', len(cached_hours), cache='weather')
+        for first, last in plan_missing_windows(cached_hours, start_ts, end_ts, max_hours=remaining):
+            plan.append((city, coords, first, last))
+            if remaining is not None:
+                remaining -= (last - first) // HOUR + 1
+    return plan
+
 def export_cache_to_csv(cache_file, output_csv):
-    cache = get_json_content(cache_file)
+    cache = load_cache(cache_file)
     if not cache:
         print("Nothing to export.")
         return
 
     with open(output_csv, 'w', newline='', encoding='utf-8') as f:
-        writer = csv.DictWriter(f, fieldnames=["city", "datetime", "temp", "humidity", "weather", "description", "wind_speed", "is_extreme"])
+        writer = csv.DictWriter(f, fieldnames=HISTORY_FIELDS)
         writer.writeheader()
         for item in cache.values():
             writer.writerow(item)
 
-def update_cache(city_dict, cache_file):
-    cache = get_json_content(cache_file)
-    if not isinstance(cache, dict):
-        cache = {}
+def export_cache_to_parquet(cache_file, output_dir):
+    """
+    Exports the cache as a Parquet dataset partitioned by city and date
+    (output_dir/city=.../date=.../*.parquet) with typed columns and
+    dictionary-encoded weather/description. One city is converted at a time.
+    Requires pyarrow.
+    """
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([
+        ("city", pa.string()),
+        ("date", pa.string()),
+        ("datetime", pa.timestamp('s')),
+        ("temp", pa.float64()),
+        ("humidity", pa.float64()),
+        ("weather", pa.dictionary(pa.int32(), pa.string())),
+        ("description", pa.dictionary(pa.int32(), pa.string())),
+        ("wind_speed", pa.float64()),
+        ("is_extreme", pa.bool_())
+    ])
 
+    def city_batches():
+        if cache_file.endswith('.json'):
+            by_city = {}
+            for item in load_cache(cache_file).values():
+                by_city.setdefault(item["city"], []).append(item)
+            yield from by_city.values()
+            return
+        with WeatherCache(cache_file) as cache:
+            for city in cache.cities():
+                yield [entry for _, entry in cache.entries_since(city)]
+
+    exported = 0
+    for items in city_batches():
+        if not items:
+            continue
+        datetimes = pa.array([item["datetime"] for item in items], pa.string())
+        table = pa.Table.from_arrays([
+            pa.array([item["city"] for item in items], pa.string()),
+            pc.utf8_slice_codeunits(datetimes, 0, 10),
+            pc.strptime(datetimes, format='%Y-%m-%d %H:%M:%S', unit='s'),
+            pa.array([item.get("temp") for item in items], pa.float64()),
+            pa.array([item.get("humidity") for item in items], pa.float64()),
+            pa.array([item.get("weather") for item in items], pa.string()).dictionary_encode(),
+            pa.array([item.get("description") for item in items], pa.string()).dictionary_encode(),
+            pa.array([item.get("wind_speed") for item in items], pa.float64()),
+            pa.array([bool(item.get("is_extreme", 0)) for item in items], pa.bool_())
+        ], schema=schema)
+        pq.write_to_dataset(
+            table,
+            root_path=output_dir,
+            partition_cols=["city", "date"],
+            existing_data_behavior='delete_matching'
+        )
+        exported += len(items)
+
+    if not exported:
+        print("Nothing to export.")
+    return exported
+
+def update_cache(city_dict, cache_file, start_date=None, num_days=2, max_new_entries=25, max_workers=4):
+    """
+    Fills the gaps in the cached hourly history of every city between
+    start_date and start_date + num_days. Only missing hours are requested,
+    merged into as few API windows as possible and fetched concurrently.
+    """
     # Multiple historical dates: May 21–27, 2023
-    start_date = datetime(2025, 4, 9)
-    date_ranges = get_unix_range_list(start_date, 2)
+    if start_date is None:
+        start_date = datetime(2025, 4, 9)
+    start_ts = int(start_date.timestamp())
+    end_ts = int((start_date + timedelta(days=num_days)).timestamp())
 
-    added = 0
+    keys = []
+    columns = {field: [] for field in HISTORY_FIELDS}
 
-    for date_str, start_ts, end_ts in date_ranges:
-        for city, coords in city_dict.items():
-            if added >= 25:
-                break
+    with WeatherCache(cache_file) as cache:
+        plan = plan_history_fetches(cache, city_dict, start_ts, end_ts, max_hours=max_new_entries)
+        if not plan:
+            print("Weather cache already covers the requested range.")
+            return 0
+        print(f"Fetching {len(plan)} history window(s) for missing hours...")
 
-            data = fetch_history(city, coords, start_ts, end_ts)
-            if data:
-                parsed_list = parse_history_data(data, city)
-                for item in parsed_list:
-                    key = build_cache_key(city, item['datetime'])
-                    if key not in cache and added < 25:
-                        cache[key] = item
-                        added += 1
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            results = executor.map(lambda job: (job, fetch_history(job[0], job[1], job[2], job[3])), plan)
+            for (city, coords, first, last), data in results:
+                if not data:
+                    continue
+                with METRICS.span('parse', city=city):
+                    parsed = parse_history_columns(data, city)
+                # 'YYYY-MM-DD HH:MM:SS' strings sort like the timestamps they format
+                first_dt, last_dt = ts_to_datetime_str(first), ts_to_datetime_str(last)
+                in_window = [first_dt <= dt <= last_dt for dt in parsed["datetime"]]
+                for field in HISTORY_FIELDS:
+                    columns[field].extend(compress(parsed[field], in_window))
+                prefix = build_cache_key(city, '')
+                keys.extend(prefix + dt for dt in compress(parsed["datetime"], in_window))
 
-    save_cache(cache, cache_file)
-    return added
+        with METRICS.span('db_write', table='weather_cache'):
+            added = cache.add_columns(keys, columns)
+        METRICS.incr('rows_skipped', len(keys) - added, table='weather_cache')
+        METRICS.incr('rows_inserted', added, table='weather_cache')
+        return added
 
 def main():
     cities_file = "cities_weather_coords.json"
-    cache_file = "weather_cache.json"
+    cache_file = "weather_cache.db"
 
     if not os.path.exists(cities_file):
         print("Missing 'cities_coords.json' with city coordinates.")
@@ -155,7 +357,12 @@ def main():
     print(f"New entries added: {added}")
     print(f"Cache file saved to: {cache_file}\n")
 
-    export_cache_to_csv(cache_file, "weather_cache.csv")
+    try:
+        exported = export_cache_to_parquet(cache_file, "weather_parquet")
+        print(f"Exported {exported} rows to weather_parquet/ (partitioned by city and date)")
+    except ImportError:
+        print("pyarrow is not installed; falling back to CSV export.")
+        export_cache_to_csv(cache_file, "weather_cache.csv")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,57 +1,101 @@
-import os
-from datetime import datetime, timedelta
-from FP_hotel_database import BookingScraper 
-from FP_weather_request import update_cache, get_json_content
-from FP_weather_database import (
-    set_up_database,
-    create_weather_type_table,
-    create_weather_data_table,
-    load_weather_data,
-    insert_weather_data
-)
-from FP_analyzer import WeatherHotelAnalyzer
-
-
-def main():
-    print("===== WEATHER-OR-NOT PROJECT =====")
+import argparse
+from FP_metrics import METRICS
+from FP_analysis_options import ENGINES, ALIGNMENTS
+
+"""
+Command-line entry point for the Weather-or-Not pipeline.
+
+Each stage is a subcommand (scrape, weather, ingest, analyze, export) and
+running without one executes the whole pipeline in order. Stage modules and
+their heavy dependencies (requests, BeautifulSoup, pandas, numpy, matplotlib)
+are imported inside the stage that needs them, so e.g. a weather refresh from
+cron never loads the analysis stack.
+"""
+
+RUN_REPORT_FILE = 'run_report.json'
+PROMETHEUS_FILE = 'run_metrics.prom'
+
+HOTEL_DB = 'weather_hotel_data.db'
+WEATHER_DB = 'weather.db'
+CACHE_FILE = 'weather_cache.db'
+LEGACY_CACHE_FILE = 'weather_cache.json'
+CITIES_COORDS_FILE = 'cities_weather_coords.json'
+CITIES = ["Detroit", "New York", "Chicago", "Miami", "Los Angeles"]
+CHECK_IN_DATE = "2025-04-22"
+CHECK_OUT_DATE = "2025-04-23"
 
-    hotel_db = 'weather_hotel_data.db'
-    cities = ["Detroit", "New York", "Chicago", "Miami", "Los Angeles"]
-    check_in_date = "2025-04-22"
-    check_out_date = "2025-04-23"
 
-    scraper = BookingScraper(db_path=hotel_db)
+def run_scrape(args):
+    from FP_hotel_database import BookingScraper, TokenBucketRateLimiter
+
+    scraper = BookingScraper(
+        db_path=args.hotel_db,
+        rate_limiter=TokenBucketRateLimiter(rate=0.5, capacity=2)
+    )
     try:
-        scraper.scrape_multiple_cities(cities, check_in_date, check_out_date)
+        scraper.scrape_multiple_cities(args.cities, args.check_in, args.check_out, max_workers=4,
+                                       incremental=True)
     finally:
         scraper.close()
 
+
+def run_weather(args):
+    from datetime import datetime
+    from FP_weather_request import update_cache, get_json_content
+    from FP_weather_cache import WeatherCache, migrate_json_cache
+
     print("\n=== Running Weather Cache Update ===")
-    cities_coords_file = 'cities_weather_coords.json'
-    cache_file = 'weather_cache.json'
+    with WeatherCache(args.cache_file) as cache:
+        migrated = migrate_json_cache(LEGACY_CACHE_FILE, cache)
+    if migrated:
+        print(f"Migrated {migrated} entries from {LEGACY_CACHE_FILE} to {args.cache_file}")
 
-    city_dict = get_json_content(cities_coords_file)
-    new_entries = update_cache(city_dict, cache_file)
-    print(f"Added {new_entries} new weather entries to {cache_file}")
+    city_dict = get_json_content(CITIES_COORDS_FILE)
+    start_date = datetime.strptime(args.start_date, '%Y-%m-%d') if args.start_date else None
+    try:
+        new_entries = update_cache(city_dict, args.cache_file, start_date=start_date, num_days=args.num_days)
+    finally:
+        from FP_http_client import close_session
+        close_session()
+    print(f"Added {new_entries} new weather entries to {args.cache_file}")
+
+
+def run_ingest(args):
+    from FP_weather_database import (
+        set_up_database,
+        create_weather_type_table,
+        create_weather_data_table,
+        ingest_new_weather_data
+    )
+    from FP_ingest_state import create_ingest_state_table
 
-    weather_db = 'weather.db'
     print("\n=== Ingesting Weather Cache into SQLite ===")
-    if os.path.exists(weather_db):
-        print(f"Removing old database: {weather_db}")
-        os.remove(weather_db)
-
-    cur, conn = set_up_database(weather_db)
-    create_weather_type_table(cur, conn)
-    create_weather_data_table(cur, conn)
-    data = load_weather_data(cache_file)
-    insert_weather_data(cur, conn, data)
-    conn.close()
-    print(f"Database initialized and populated: {weather_db}")
+    cur, conn = set_up_database(args.weather_db)
+    try:
+        create_weather_type_table(cur, conn)
+        create_weather_data_table(cur, conn)
+        create_ingest_state_table(cur, conn)
+        ingested = ingest_new_weather_data(cur, conn, args.cache_file)
+    finally:
+        conn.close()
+    print(f"Ingested {ingested} new weather rows into {args.weather_db}")
+
+
+def run_analyze(args):
+    from FP_analyzer import WeatherHotelAnalyzer
+    from FP_weather_request import get_json_content
 
     print("\n=== Running Data Analysis ===")
+    timezones = {
+        city: coords['timezone'] for city, coords in get_json_content(CITIES_COORDS_FILE).items()
+        if coords.get('timezone')
+    }
     analyzer = WeatherHotelAnalyzer(
-        hotel_db_path=hotel_db,
-        weather_db_path=weather_db
+        hotel_db_path=args.hotel_db,
+        weather_db_path=args.weather_db,
+        engine=args.engine,
+        alignment=args.alignment,
+        timezones=timezones
     )
     try:
         analyzer.run_analysis()
@@ -59,5 +103,67 @@ def main():
         analyzer.close()
 
 
+def run_export(args):
+    from FP_weather_request import export_cache_to_parquet, export_cache_to_csv
+
+    print("\n=== Exporting Weather Cache ===")
+    try:
+        exported = export_cache_to_parquet(args.cache_file, args.parquet_dir)
+        print(f"Exported {exported} rows to {args.parquet_dir}/ (partitioned by city and date)")
+    except ImportError:
+        print("pyarrow is not installed; falling back to CSV export.")
+        export_cache_to_csv(args.cache_file, args.csv_file)
+
+
+STAGES = {
+    'scrape': run_scrape,
+    'weather': run_weather,
+    'ingest': run_ingest,
+    'analyze': run_analyze,
+    'export': run_export,
+}
+
+# Stages run by a bare `python main.py`, in order
+PIPELINE = ('scrape', 'weather', 'ingest', 'analyze')
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Weather-or-Not: hotel prices vs. weather pipeline.")
+    parser.add_argument('stage', nargs='?', choices=sorted(STAGES), help="run a single stage (default: all)")
+    parser.add_argument('--hotel-db', default=HOTEL_DB)
+    parser.add_argument('--weather-db', default=WEATHER_DB)
+    parser.add_argument('--cache-file', default=CACHE_FILE)
+    parser.add_argument('--cities', nargs='+', default=CITIES, help="cities to scrape")
+    parser.add_argument('--check-in', default=CHECK_IN_DATE, help="check-in date (YYYY-MM-DD)")
+    parser.add_argument('--check-out', default=CHECK_OUT_DATE, help="check-out date (YYYY-MM-DD)")
+    parser.add_argument('--start-date', default=None, help="first day of weather history (YYYY-MM-DD)")
+    parser.add_argument('--num-days', type=int, default=2, help="days of weather history to cache")
+    parser.add_argument('--engine', default='pandas', choices=ENGINES, help="analysis engine")
+    parser.add_argument('--alignment', default='hourly', choices=ALIGNMENTS,
+                        help="how hotels are matched to hourly weather (pandas engine)")
+    parser.add_argument('--parquet-dir', default='weather_parquet')
+    parser.add_argument('--csv-file', default='weather_cache.csv')
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.alignment != 'hourly' and args.engine != 'pandas':
+        parser.error(f"--alignment {args.alignment} requires --engine pandas")
+    stages = [args.stage] if args.stage else PIPELINE
+
+    print("===== WEATHER-OR-NOT PROJECT =====")
+    try:
+        with METRICS.span('run'):
+            for stage in stages:
+                with METRICS.span('stage', stage=stage):
+                    STAGES[stage](args)
+    finally:
+        METRICS.write_json(RUN_REPORT_FILE)
+        METRICS.write_prometheus(PROMETHEUS_FILE)
+        print(f"\nRun metrics written to {RUN_REPORT_FILE} and {PROMETHEUS_FILE}")
+
+
 if __name__ == "__main__":
     main()
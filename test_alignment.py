@@ -0,0 +1,42 @@
+import pytest
+
+pd = pytest.importorskip("pandas")
+
+from FP_alignment import align_daily, summarize_weather
+
+TIMEZONES = {"Detroit": "America/Detroit"}
+
+
+def weather_rows(*hours):
+    return pd.DataFrame({
+        "location": "Detroit",
+        "datetime": list(hours),
+        "temp": [10.0 + i for i in range(len(hours))],
+        "humidity": 50,
+        "wind_speed": 1.0,
+        "weather_type": "Clear",
+        "is_extreme": 0,
+    })
+
+
+def test_summarize_weather_cuts_days_on_local_clock():
+    # 02:00 UTC on the 9th is 22:00 on the 8th in Detroit (UTC-4)
+    weather = weather_rows("2025-04-09 02:00:00", "2025-04-09 05:00:00")
+
+    utc_days = summarize_weather(weather)
+    local_days = summarize_weather(weather, timezones=TIMEZONES)
+
+    assert [str(day) for day in utc_days["date"]] == ["2025-04-09"]
+    assert [(str(day), hours) for day, hours in zip(local_days["date"], local_days["hours"])] == [
+        ("2025-04-08", 1), ("2025-04-09", 1)
+    ]
+
+
+def test_align_daily_joins_local_check_in_day():
+    weather = weather_rows("2025-04-09 02:00:00", "2025-04-09 05:00:00")
+    hotels = pd.DataFrame({"hotel_name": ["A"], "location": ["Detroit"], "price": [100.0],
+                           "check_in_date": ["2025-04-08"]})
+
+    merged = align_daily(hotels, weather, TIMEZONES)
+
+    assert merged[["hotel_name", "temp", "hours"]].values.tolist() == [["A", 10.0, 1]]
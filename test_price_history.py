@@ -0,0 +1,92 @@
+import sqlite3
+
+import pytest
+
+from FP_price_history import forget_scrapes, get_price_history, record_observations
+from FP_rollup import refresh_hotel_rollup
+from FP_schema import ensure_hotel_schema
+
+
+@pytest.fixture
+def conn():
+    conn = sqlite3.connect(":memory:")
+    ensure_hotel_schema(conn)
+    yield conn
+    conn.close()
+
+
+def scrape(hotel, price, scrape_date, check_in_date="2025-05-01", location="Detroit"):
+    return (hotel, location, price, 8.0, 100, scrape_date, check_in_date)
+
+
+def runs(conn, hotel="A"):
+    return [(first, last, price) for _, first, last, price, _, _ in get_price_history(conn, hotel, "Detroit")]
+
+
+def test_record_observations_extends_latest_run(conn):
+    assert record_observations(conn, [scrape("A", 100.0, "2025-04-01")]) == (1, 0)
+    assert record_observations(conn, [scrape("A", 100.0, "2025-04-02")]) == (0, 1)
+    assert record_observations(conn, [scrape("A", 120.0, "2025-04-03")]) == (1, 0)
+    assert record_observations(conn, [scrape("A", 120.0, "2025-04-03")]) == (0, 0)
+    assert runs(conn) == [("2025-04-01", "2025-04-02", 100.0), ("2025-04-03", "2025-04-03", 120.0)]
+
+
+def test_record_observations_late_row_joins_runs(conn):
+    record_observations(conn, [scrape("A", 100.0, "2025-04-01"), scrape("B", 90.0, "2025-04-02")])
+    record_observations(conn, [scrape("A", 100.0, "2025-04-03"), scrape("B", 90.0, "2025-04-03")])
+    assert runs(conn) == [("2025-04-01", "2025-04-03", 100.0)]
+
+    record_observations(conn, [scrape("A", 120.0, "2025-04-04")])
+    record_observations(conn, [scrape("A", 100.0, "2025-04-06")])
+    assert record_observations(conn, [scrape("A", 120.0, "2025-04-05")]) == (0, 1)
+    assert runs(conn) == [
+        ("2025-04-01", "2025-04-03", 100.0),
+        ("2025-04-04", "2025-04-05", 120.0),
+        ("2025-04-06", "2025-04-06", 100.0),
+    ]
+
+
+def test_record_observations_late_row_splits_covering_run(conn):
+    for day in range(1, 6):
+        record_observations(conn, [scrape("A", 100.0, f"2025-04-0{day}")])
+    assert record_observations(conn, [scrape("A", 150.0, "2025-04-03")]) == (1, 0)
+    assert runs(conn) == [
+        ("2025-04-01", "2025-04-02", 100.0),
+        ("2025-04-03", "2025-04-03", 150.0),
+        ("2025-04-04", "2025-04-05", 100.0),
+    ]
+
+
+def test_record_observations_same_hotel_twice_in_one_scrape(conn):
+    rows = [scrape("A", 100.0, "2025-04-01"), scrape("a.", 110.0, "2025-04-01")]
+    assert record_observations(conn, rows) == (2, 0)
+    assert sorted(runs(conn)) == [("2025-04-01", "2025-04-01", 100.0), ("2025-04-01", "2025-04-01", 110.0)]
+
+
+def test_forget_scrapes_then_replace(conn):
+    for day, price in ((1, 100.0), (2, 100.0), (3, 100.0)):
+        record_observations(conn, [scrape("A", price, f"2025-04-0{day}")])
+
+    forget_scrapes(conn, [("Detroit", "2025-05-01", "2025-04-02")])
+    assert runs(conn) == [("2025-04-01", "2025-04-01", 100.0), ("2025-04-03", "2025-04-03", 100.0)]
+
+    record_observations(conn, [scrape("A", 130.0, "2025-04-02")])
+    forget_scrapes(conn, [("Detroit", "2025-05-01", "2025-04-02")])
+    record_observations(conn, [scrape("A", 100.0, "2025-04-02")])
+    assert runs(conn) == [("2025-04-01", "2025-04-03", 100.0)]
+
+    forget_scrapes(conn, [("Detroit", "2025-05-01", day) for day in ("2025-04-01", "2025-04-02", "2025-04-03")])
+    assert runs(conn) == []
+
+
+def test_hotels_view_weights_runs_by_scrapes(conn):
+    for day in range(5):
+        record_observations(conn, [
+            scrape("A", 100.0, f"2025-04-0{day + 1}"),
+            scrape("B", 200.0 + day, f"2025-04-0{day + 1}"),
+        ])
+    refresh_hotel_rollup(conn)
+
+    total, weight = conn.execute("SELECT SUM(price * scrapes), SUM(scrapes) FROM hotels").fetchone()
+    assert (weight, total / weight) == (10, 151.0)
+    assert conn.execute("SELECT n, n_price, sum_price FROM Hotel_Daily_Rollup").fetchall() == [(10, 10, 1510.0)]
@@ -0,0 +1,97 @@
+import sqlite3
+
+import pytest
+
+from FP_rollup import refresh_hotel_rollup, refresh_weather_rollup
+from FP_weather_database import create_weather_data_table, create_weather_type_table, insert_weather_data
+
+WEATHER_ENTRIES = [
+    {"city": city, "datetime": f"2025-05-0{day} {hour:02d}:00:00", "temp": 10.0 + day + hour % 3,
+     "humidity": 50, "wind_speed": 2.0, "description": weather.lower(), "weather": weather, "is_extreme": 0}
+    for city in ("Detroit", "Miami")
+    for day in (1, 2)
+    for hour, weather in enumerate(["Clear", "Clear", "Rainy", "Cloudy", "Clear"])
+]
+
+
+def hotel(name, city, price, scrape_date, check_in_date):
+    return {"hotel_name": name, "location": city, "price": price, "rating": 8.0, "review_count": 100,
+            "scrape_date": scrape_date, "check_in_date": check_in_date}
+
+
+HOTEL_SCRAPES = [
+    # Repeated prices extend runs, changed ones start new runs
+    [hotel("A", "Detroit", 100.0, "2025-04-01", "2025-05-01"), hotel("B", "Detroit", 200.0, "2025-04-01", "2025-05-01"),
+     hotel("C", "Miami", 300.0, "2025-04-01", "2025-05-02")],
+    [hotel("A", "Detroit", 100.0, "2025-04-02", "2025-05-01"), hotel("B", "Detroit", 210.0, "2025-04-02", "2025-05-01"),
+     hotel("C", "Miami", 300.0, "2025-04-02", "2025-05-02"), hotel("D", "Miami", None, "2025-04-02", "2025-05-02")],
+    [hotel("A", "Detroit", 100.0, "2025-04-03", "2025-05-01"), hotel("B", "Detroit", 200.0, "2025-04-03", "2025-05-02")],
+]
+
+
+def rollup_rows(conn, table):
+    return conn.execute(f"SELECT * FROM {table} ORDER BY 1, 2, 3").fetchall()
+
+
+def assert_matches_full_recompute(conn, table, refresh):
+    incremental = rollup_rows(conn, table)
+    refresh(conn)
+    assert incremental and incremental == rollup_rows(conn, table)
+
+
+@pytest.fixture
+def weather_db(tmp_path):
+    path = str(tmp_path / "weather.db")
+    conn = sqlite3.connect(path)
+    cur = conn.cursor()
+    create_weather_type_table(cur, conn)
+    create_weather_data_table(cur, conn)
+    insert_weather_data(cur, conn, WEATHER_ENTRIES[:7], chunk_size=3)
+    insert_weather_data(cur, conn, WEATHER_ENTRIES[4:], chunk_size=3)
+    yield path, conn
+    conn.close()
+
+
+@pytest.fixture
+def hotel_db(tmp_path):
+    pytest.importorskip("requests")
+    from FP_hotel_database import BookingScraper
+    scraper = BookingScraper(db_path=str(tmp_path / "hotels.db"), session=object())
+    for scrape in HOTEL_SCRAPES:
+        scraper.save_to_db(scrape)
+    # Saving a page again replaces it
+    scraper.save_to_db([hotel("B", "Detroit", 250.0, "2025-04-02", "2025-05-01")], replace=True)
+    yield scraper.db_path, scraper.conn
+    scraper.close()
+
+
+def test_weather_rollup_incremental_matches_full_recompute(weather_db):
+    _, conn = weather_db
+    assert_matches_full_recompute(conn, "Weather_Daily_Rollup", refresh_weather_rollup)
+
+
+def test_hotel_rollup_incremental_matches_full_recompute(hotel_db):
+    _, conn = hotel_db
+    assert_matches_full_recompute(conn, "Hotel_Daily_Rollup", refresh_hotel_rollup)
+
+
+def test_rollup_engine_matches_sql_engine(hotel_db, weather_db, tmp_path, monkeypatch):
+    pd = pytest.importorskip("pandas")
+    from FP_analyzer import WeatherHotelAnalyzer
+    monkeypatch.chdir(tmp_path)
+    results = {}
+    for engine in ("sql", "rollup"):
+        analyzer = WeatherHotelAnalyzer(hotel_db_path=hotel_db[0], weather_db_path=weather_db[0], engine=engine)
+        try:
+            results[engine] = (
+                analyzer.get_city_stats(),
+                analyzer.get_price_by_location_weather(),
+                analyzer.get_price_by_weather_type(),
+                analyzer.get_temp_price_correlation(),
+            )
+        finally:
+            analyzer.close()
+
+    for sql_frame, rollup_frame in zip(results["sql"][:3], results["rollup"][:3]):
+        pd.testing.assert_frame_equal(sql_frame, rollup_frame, check_dtype=False)
+    assert results["rollup"][3] == pytest.approx(results["sql"][3])
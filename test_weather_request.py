@@ -0,0 +1,69 @@
+from datetime import datetime, timezone
+
+import pytest
+
+import FP_weather_request
+from FP_weather_cache import WeatherCache
+from FP_weather_request import HISTORY_FIELDS, parse_history_columns, parse_history_data, update_cache
+
+
+def test_parse_history_columns_empty_list():
+    columns = parse_history_columns({"list": []}, "Detroit")
+    assert columns == {field: [] for field in HISTORY_FIELDS}
+
+
+def test_parse_history_columns_missing_list():
+    assert parse_history_data({}, "Detroit") == []
+
+
+def test_parse_history_columns_entries():
+    pytest.importorskip("numpy")
+    data = {"list": [{
+        "dt": 1744156800,
+        "main": {"temp": 41.0, "humidity": 50},
+        "weather": [{"main": "Clear", "description": "clear sky"}],
+        "wind": {"speed": 3.5},
+    }]}
+    assert parse_history_data(data, "Detroit") == [{
+        "city": "Detroit",
+        "datetime": "2025-04-09 00:00:00",
+        "temp": 41.0,
+        "humidity": 50,
+        "weather": "Clear",
+        "description": "clear sky",
+        "wind_speed": 3.5,
+        "is_extreme": 1,
+    }]
+
+
+def test_add_columns_skips_existing_keys(tmp_path):
+    columns = {
+        "city": ["Detroit", "Detroit"],
+        "datetime": ["2025-04-09 00:00:00", "2025-04-09 01:00:00"],
+        "temp": [41.0, None],
+    }
+    keys = ["detroit_2025-04-09 00:00:00", "detroit_2025-04-09 01:00:00"]
+    with WeatherCache(str(tmp_path / "cache.db")) as cache:
+        assert cache.add_columns(keys[:1], {field: values[:1] for field, values in columns.items()}) == 1
+        assert cache.add_columns(keys, columns) == 1
+        assert cache.get(keys[1]) == {"city": "Detroit", "datetime": "2025-04-09 01:00:00", "temp": None}
+
+
+def test_update_cache_stores_fetched_hours_in_window(tmp_path, monkeypatch):
+    pytest.importorskip("numpy")
+    start = datetime(2025, 4, 9, tzinfo=timezone.utc)
+    start_ts = int(start.timestamp())
+    payload = {"list": [
+        {"dt": start_ts + hour * 3600, "main": {"temp": 10.0 + hour, "humidity": 50},
+         "weather": [{"main": "Clear", "description": "clear sky"}], "wind": {"speed": 1.0}}
+        for hour in range(-1, 4)
+    ]}
+    monkeypatch.setattr(FP_weather_request, "fetch_history", lambda city, coords, first, last: payload)
+    path = str(tmp_path / "cache.db")
+
+    added = update_cache({"Detroit": {"lat": 0, "lon": 0}}, path, start_date=start, num_days=1, max_new_entries=3)
+
+    assert added == 3
+    with WeatherCache(path) as cache:
+        assert [entry["temp"] for entry in cache.values()] == [10.0, 11.0, 12.0]
+        assert cache.get("detroit_2025-04-09 02:00:00")["datetime"] == "2025-04-09 02:00:00"